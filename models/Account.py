@@ -5,6 +5,7 @@ import datetime
 import requests
 from dotenv import load_dotenv
 import os
+from pose_pool import POOL
 
 # Firebase Admin initialization
 if not firebase_admin._apps:
@@ -13,6 +14,10 @@ if not firebase_admin._apps:
     firebase_admin.initialize_app(cred)
 
 db = firestore.client()
+
+# Build and warm the shared pose estimators in the background so the first
+# "Start Camera" on the Yoga / Train pages does not pay for model loading
+POOL.warm_async()
 load_dotenv() 
 # Firebase Web API key (from Firebase console > Project settings > General > Web API key)
 API_KEY = os.getenv('API_KEY')
@@ -0,0 +1,135 @@
+import argparse
+import logging
+import os
+import threading
+
+import numpy as np
+
+from pose_features import ANGLES, FEATURE_NAMES, compute_features, landmarks_to_array
+from yoga_tracks import ASANAS
+
+# Asana recognition by nearest neighbour. Every reference photo listed in ASANAS is
+# run through MediaPipe once and reduced to its joint-angle vector; the mirrored
+# vector (left / right swapped) is added too, so a pose done on the other side
+# still matches. Each frame's angles are then compared against the whole library
+# in one vectorized distance computation and the k nearest references vote.
+#
+#   python asana_library.py --build
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LIBRARY_PATH = os.path.join(HERE, "asana_library.npz")
+
+# Angles only; the distance features are in image units and depend on framing
+ANGLE_COLUMNS = np.array([FEATURE_NAMES.index(name) for name in ANGLES])
+_ANGLE_NAMES = list(ANGLES)
+MIRROR = np.array([_ANGLE_NAMES.index(name.replace("left_", "#").replace("right_", "left_").replace("#", "right_"))
+                   for name in _ANGLE_NAMES])
+
+
+def _reference_paths():
+    return [(name, os.path.normpath(os.path.join(HERE, path)))
+            for name, asana in ASANAS.items() for path in asana.get("references", [asana["image"]])]
+
+
+def build_library(path=LIBRARY_PATH):
+    import mediapipe as mp
+    from PIL import Image
+
+    names, vectors, sources = [], [], []
+    with mp.solutions.pose.Pose(static_image_mode=True, model_complexity=2) as pose:
+        for name, image_path in _reference_paths():
+            image = np.asarray(Image.open(image_path).convert("RGB"))
+            results = pose.process(image)
+            if not results.pose_landmarks:
+                logging.warning(f"No person found in reference image {image_path}")
+                continue
+            angles = compute_features(landmarks_to_array(results.pose_landmarks.landmark))[ANGLE_COLUMNS]
+            for vector in (angles, angles[MIRROR]):
+                names.append(name)
+                vectors.append(vector)
+                sources.append(os.path.relpath(image_path, HERE))
+    if not vectors:
+        raise ValueError("No usable reference images for the asana library")
+    np.savez(path, names=np.array(names), vectors=np.array(vectors, dtype=np.float32), sources=np.array(sources))
+    return path
+
+
+def _is_stale(path):
+    if not os.path.exists(path):
+        return True
+    built = os.path.getmtime(path)
+    with np.load(path) as library:
+        sources = set(library["sources"].tolist())
+    for _, image_path in _reference_paths():
+        if os.path.relpath(image_path, HERE) not in sources and os.path.exists(image_path):
+            return True
+        if os.path.exists(image_path) and os.path.getmtime(image_path) > built:
+            return True
+    return False
+
+
+class AsanaRecognizer:
+
+    def __init__(self, names, vectors, k=3, max_distance=25.0):
+        # vectors: (references, angles) in degrees; max_distance is an RMS angle error
+        self.names = np.asarray(names)
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        self.labels = tuple(dict.fromkeys(self.names.tolist()))
+        self._label_index = np.array([self.labels.index(name) for name in self.names])
+        self.k = min(k, len(self.vectors))
+        self.max_distance = max_distance
+
+    @classmethod
+    def load(cls, path=LIBRARY_PATH, **kwargs):
+        with np.load(path) as library:
+            return cls(library["names"], library["vectors"], **kwargs)
+
+    def distances(self, features):
+        # (features,) -> (references,) or (frames, features) -> (frames, references)
+        angles = np.asarray(features, dtype=np.float32)[..., ANGLE_COLUMNS]
+        return np.sqrt(np.mean((angles[..., None, :] - self.vectors) ** 2, axis=-1))
+
+    def classify(self, features):
+        # (asana name or None, confidence in [0, 1]) for one frame
+        distances = self.distances(features)
+        if np.isnan(distances).all():
+            return None, 0.0
+        nearest = np.argpartition(distances, self.k - 1)[:self.k]
+        if distances[nearest].min() > self.max_distance:
+            return None, 0.0
+        # Inverse-distance vote among the k nearest, scaled down as the best match gets farther away
+        weights = 1.0 / (distances[nearest] + 1.0)
+        votes = np.bincount(self._label_index[nearest], weights=weights, minlength=len(self.labels))
+        best = int(votes.argmax())
+        closeness = 1.0 - distances[nearest].min() / self.max_distance
+        return self.labels[best], float(votes[best] / votes.sum() * closeness)
+
+
+_recognizer = None
+_lock = threading.Lock()
+
+
+def get_recognizer(path=LIBRARY_PATH):
+    # Built from the reference images on first use (or when they change), then shared by the process
+    global _recognizer
+    with _lock:
+        if _recognizer is None:
+            if _is_stale(path):
+                build_library(path)
+            _recognizer = AsanaRecognizer.load(path)
+        return _recognizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the asana recognizer library from the reference images")
+    parser.add_argument("--build", action="store_true", help="rebuild even if the library is up to date")
+    parser.add_argument("--out", default=LIBRARY_PATH)
+    args = parser.parse_args()
+    if args.build or _is_stale(args.out):
+        build_library(args.out)
+    recognizer = AsanaRecognizer.load(args.out)
+    print(f"{len(recognizer.vectors)} reference vectors for {len(recognizer.labels)} asanas in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
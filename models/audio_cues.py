@@ -0,0 +1,61 @@
+import logging
+import os
+import queue
+import threading
+import wave
+
+# Non-blocking audio cues. The sound is decoded once into a PCM buffer and played
+# on a background worker, so the frame loop never waits for the bell to finish.
+# simpleaudio plays the pre-decoded buffer when installed; otherwise the worker
+# falls back to playsound on the file.
+
+try:
+    import simpleaudio
+except ImportError:
+    simpleaudio = None
+
+
+class AudioCue:
+
+    def __init__(self, path):
+        self.path = path
+        with wave.open(path, "rb") as wav:
+            self.channels = wav.getnchannels()
+            self.sample_width = wav.getsampwidth()
+            self.rate = wav.getframerate()
+            self.pcm = wav.readframes(wav.getnframes())
+        self._requests = queue.Queue(maxsize=1)
+        self._worker = threading.Thread(target=self._run, name="audio-cue", daemon=True)
+        self._worker.start()
+
+    def play(self):
+        # Never blocks; a cue requested while one is still pending is dropped
+        try:
+            self._requests.put_nowait(True)
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while True:
+            self._requests.get()
+            try:
+                if simpleaudio is not None:
+                    simpleaudio.play_buffer(self.pcm, self.channels, self.sample_width, self.rate).wait_done()
+                else:
+                    from playsound import playsound
+                    playsound(self.path)
+            except Exception as e:
+                logging.error(f"Audio cue failed: {e}")
+
+
+_cues = {}
+_lock = threading.Lock()
+
+
+def get_cue(name="bell.wav"):
+    # One decoded buffer and worker per sound for the whole process
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    with _lock:
+        if path not in _cues:
+            _cues[path] = AudioCue(path)
+        return _cues[path]
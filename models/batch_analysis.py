@@ -0,0 +1,139 @@
+import argparse
+import importlib.util
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from hold_timer import HoldTimer
+from pose_features import FEATURE_NAMES, NUM_LANDMARKS, compute_features, landmarks_to_array
+from rep_counter import RepCounter
+from yoga_tracks import ASANAS, RULES, TRACKS
+
+# Headless analysis of recorded workout videos. Runs the same pose features and
+# Yoga / Train rules as the pages over video files instead of the webcam and writes
+# per-frame landmarks, angles, verdicts and rep counts to CSV or Parquet.
+#
+#   python batch_analysis.py clips/*.mp4 --mode yoga --track "Track 1" --out results/
+#   python batch_analysis.py clips/*.mp4 --mode curl --workers 4 --format parquet
+#   python batch_analysis.py clips/*.mp4 --mode squat
+
+REP_MODES = {"curl": "Bicep Curl", "squat": "Squat", "pushup": "Push-up"}
+LANDMARK_COLUMNS = [f"lm{i:02d}_{axis}" for i in range(NUM_LANDMARKS) for axis in ("x", "y", "z", "v")]
+
+
+def extract_landmarks(path, model_complexity=1):
+    # Run MediaPipe over every frame; frames without a person are NaN rows
+    import mediapipe as mp
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    points, times = [], []
+    with mp.solutions.pose.Pose(model_complexity=model_complexity,
+                                min_detection_confidence=0.5,
+                                min_tracking_confidence=0.5) as pose:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+            times.append(msec / 1000.0 if msec > 0 else len(times) / fps)
+            results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            if results.pose_landmarks:
+                points.append(landmarks_to_array(results.pose_landmarks.landmark))
+            else:
+                points.append(np.full((NUM_LANDMARKS, 4), np.nan))
+    cap.release()
+    return np.asarray(points, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 4), np.asarray(times)
+
+
+def track_progress(verdicts, times, track):
+    # Walk the track with the same hold timer as the Yoga page, on the video clock
+    timer = HoldTimer([ASANAS[name]["hold"] for name in track])
+    pose_number = np.zeros(len(times), dtype=np.int32)
+    held = np.zeros(len(times), dtype=np.float32)
+    for k, t in enumerate(times):
+        if not timer.done:
+            timer.update(verdicts[k, RULES.index[track[timer.index]]], t)
+        pose_number[k] = timer.index + 1
+        held[k] = timer.held
+    return pose_number, held
+
+
+def count_reps(features, times, exercise="Bicep Curl"):
+    # Same rep engine as the Train page, on the video clock
+    counter = RepCounter([exercise])
+    stages, reps = [], []
+    for row, t in zip(features, times):
+        counter.update(row, t)
+        count, stage = counter.summary(exercise)[:2]
+        stages.append(stage)
+        reps.append(count)
+    return stages, reps
+
+
+def analyse_video(path, mode="yoga", track="Track 1", model_complexity=1):
+    points, times = extract_landmarks(path, model_complexity)
+    features = compute_features(points)
+
+    table = pd.DataFrame(points.reshape(len(points), -1), columns=LANDMARK_COLUMNS)
+    table.insert(0, "time_s", times)
+    table.insert(0, "frame", np.arange(len(times)))
+    table[list(FEATURE_NAMES)] = features
+
+    if mode == "yoga":
+        verdicts = RULES.evaluate(features)
+        for name in RULES.names:
+            table[f"is_{name}"] = verdicts[:, RULES.index[name]]
+        pose_number, held = track_progress(verdicts, times, TRACKS[track])
+        table["pose_number"] = pose_number
+        table["held_s"] = held
+    else:
+        table["stage"], table["reps"] = count_reps(features, times, REP_MODES[mode])
+    return table
+
+
+def _analyse_to_file(path, out_dir, fmt, mode, track, model_complexity):
+    table = analyse_video(path, mode, track, model_complexity)
+    name = os.path.splitext(os.path.basename(path))[0]
+    target = os.path.join(out_dir, f"{name}.{fmt}")
+    if fmt == "parquet":
+        table.to_parquet(target, index=False)
+    else:
+        table.to_csv(target, index=False)
+    return target, len(table), float(table["time_s"].iloc[-1]) if len(table) else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Yoga / Train pose rules over recorded videos")
+    parser.add_argument("videos", nargs="+", help="video files to analyse")
+    parser.add_argument("--mode", choices=["yoga", *REP_MODES], default="yoga")
+    parser.add_argument("--track", choices=list(TRACKS), default="Track 1")
+    parser.add_argument("--out", default="analysis", help="output directory")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--complexity", type=int, choices=[0, 1, 2], default=1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    if args.format == "parquet" and not any(importlib.util.find_spec(m) for m in ("pyarrow", "fastparquet")):
+        # Checked here, not per file inside the pool
+        parser.error("--format parquet needs pyarrow (pip install pyarrow)")
+
+    os.makedirs(args.out, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        jobs = {pool.submit(_analyse_to_file, path, args.out, args.format, args.mode,
+                            args.track, args.complexity): path for path in args.videos}
+        for job in as_completed(jobs):
+            try:
+                target, frames, duration = job.result()
+                print(f"{jobs[job]} -> {target} ({frames} frames, {duration:.1f}s of video)")
+            except Exception as e:
+                logging.error(f"Failed to analyse {jobs[job]}: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import os
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+import pandas as pd
+
+from batch_analysis import LANDMARK_COLUMNS
+from hud_overlay import HudOverlay, draw_skeleton
+from pose_features import NUM_LANDMARKS, compute_features
+from pose_smoothing import FrameSkipper, to_landmark_list
+from rep_counter import RepCounter
+from session_log import SessionLog
+from yoga_tracks import RULES
+
+# Benchmark of the per-frame work in the Yoga / Train loops. Replays a stored landmark
+# sequence (and optionally the frames of a short clip) through every stage after
+# pose.process and reports p50/p95/p99 latency and FPS per stage.
+#
+#   python bench_pose.py                                  # recorded curls, bench/bicep_curl.npz
+#   python bench_pose.py --landmarks analysis/clip.csv    # output of batch_analysis.py
+#   python bench_pose.py --landmarks session.npz --clip clip.mp4
+#   python bench_pose.py --landmarks sessions/<user>/<session>/
+
+mp_pose = mp.solutions.pose
+
+# MediaPipe Pose (model_complexity=1, video mode) run over gif/bicep.gif played eight
+# times in a row: 320 frames of two-arm curls at 25 fps, 8 reps
+RECORDED = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench", "bicep_curl.npz")
+
+
+def load_landmarks(path):
+    if os.path.isdir(path):
+        points = SessionLog(path).points
+        return points[~np.isnan(points).any(axis=(1, 2))]
+    if path.endswith(".npz"):
+        return np.load(path)["points"].astype(np.float32)
+    table = pd.read_csv(path)
+    points = table[LANDMARK_COLUMNS].to_numpy(np.float32).reshape(len(table), NUM_LANDMARKS, 4)
+    return points[~np.isnan(points).any(axis=(1, 2))]
+
+
+def load_frames(path, size, limit=300):
+    if path is None:
+        rng = np.random.default_rng(1)
+        return [rng.integers(0, 255, size=(size[1], size[0], 3), dtype=np.uint8) for _ in range(8)]
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.resize(frame, size))
+    cap.release()
+    return frames
+
+
+def make_hud():
+    # The same cached HUD the Train page sets up
+    hud = HudOverlay()
+    hud.panel(((0, 0), (225, 73)), (245, 117, 16))
+    hud.text("reps_label", 'REPS', (15, 12), 0.5, (0, 0, 0), 1, cv2.LINE_AA)
+    hud.text("stage_label", 'STAGE', (65, 12), 0.5, (0, 0, 0), 1, cv2.LINE_AA)
+    return hud
+
+
+def update_hud(hud, counter, stage, verdict):
+    hud.text("reps", str(counter), (10, 60), 2, (255, 255, 255), 2, cv2.LINE_AA)
+    hud.text("stage", stage or "None", (60, 60), 2, (255, 255, 255), 2, cv2.LINE_AA)
+    hud.text("verdict", verdict, (50, 120), 1, (0, 255, 0))
+
+
+def run(points, frames, jpeg_quality=80):
+    timings = {name: [] for name in ("smoothing", "features", "rules", "skeleton", "hud", "handoff", "total")}
+    skipper = FrameSkipper(lambda item: item, every_n=1)
+    hud = make_hud()
+    reps = RepCounter()
+    for k, frame_points in enumerate(points):
+        image = frames[k % len(frames)].copy()
+        raw = _Results(frame_points)
+        t0 = time.perf_counter()
+        result = skipper.process(raw, timestamp=k / 30.0)
+        t1 = time.perf_counter()
+        features = compute_features(result.points)
+        t2 = time.perf_counter()
+        verdicts = RULES.evaluate(features)
+        reps.update(features, k / 30.0)
+        counter, stage = reps.summary("Bicep Curl")[:2]
+        t3 = time.perf_counter()
+        draw_skeleton(image, result.points, mp_pose.POSE_CONNECTIONS, (0, 255, 0), (255, 0, 0))
+        t4 = time.perf_counter()
+        update_hud(hud, counter, stage, "Pose: Correct" if verdicts.any() else "Pose: Incorrect")
+        hud.apply(image)
+        t5 = time.perf_counter()
+        # What st.image does with a BGR frame: channel swap + encode
+        cv2.imencode(".jpg", cv2.cvtColor(image, cv2.COLOR_BGR2RGB), [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        t6 = time.perf_counter()
+        for name, (start, end) in zip(timings, [(t0, t1), (t1, t2), (t2, t3), (t3, t4), (t4, t5), (t5, t6), (t0, t6)]):
+            timings[name].append(end - start)
+    return timings
+
+
+class _Results:
+    # Minimal stand-in for MediaPipe results so the replay goes through FrameSkipper
+    def __init__(self, points):
+        self.pose_landmarks = to_landmark_list(points)
+
+
+def report(timings):
+    rows = []
+    for name, values in timings.items():
+        ms = np.asarray(values) * 1000.0
+        rows.append({
+            "stage": name,
+            "p50_ms": np.percentile(ms, 50),
+            "p95_ms": np.percentile(ms, 95),
+            "p99_ms": np.percentile(ms, 99),
+            "fps": 1000.0 / ms.mean() if ms.mean() else float("inf"),
+        })
+    return pd.DataFrame(rows).set_index("stage")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-frame stages of the pose pages")
+    parser.add_argument("--landmarks", default=RECORDED,
+                        help="recorded session directory, .npz with a 'points' (frames, 33, 4) array, or a batch_analysis CSV")
+    parser.add_argument("--clip", help="video whose frames are used as drawing backgrounds")
+    parser.add_argument("--frames", type=int, default=600, help="replay the landmarks until at least this many frames")
+    parser.add_argument("--size", default="800x600", help="frame size the pages draw on")
+    parser.add_argument("--warmup", type=int, default=30)
+    args = parser.parse_args()
+
+    points = load_landmarks(args.landmarks)
+    # The same frames in the same order on every run, so results compare across changes
+    points = np.resize(points, (max(args.frames, len(points)), *points.shape[1:]))
+    size = tuple(int(v) for v in args.size.split("x"))
+    frames = load_frames(args.clip, size)
+
+    run(points[:args.warmup], frames)
+    table = report(run(points, frames))
+    print(f"{len(points)} frames at {size[0]}x{size[1]}")
+    print(table.to_string(float_format=lambda v: f"{v:8.3f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import atexit
+import logging
+import threading
+
+import cv2
+
+# Shared camera handles. A device is opened lazily when the first camera session
+# starts, negotiated to MJPG at the requested size / frame rate and shared by every
+# session that needs it. When the last user lets go the handle lingers for a moment,
+# so a Streamlit rerun that restarts the loop reuses it instead of reopening the
+# device; an explicit stop releases it immediately.
+
+
+class Camera:
+
+    def __init__(self, index=0, width=640, height=480, fps=30, fourcc="MJPG"):
+        self.index = index
+        self.requested = (width, height, fps, fourcc)
+        self.users = 0
+        self._cap = None
+        self._close_timer = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._cap is not None and self._cap.isOpened()
+
+    def open(self):
+        if self.is_open:
+            return
+        width, height, fps, fourcc = self.requested
+        cap = cv2.VideoCapture(self.index)
+        # FOURCC first: many UVC cameras only offer higher resolutions / rates as MJPG
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        cap.set(cv2.CAP_PROP_FPS, fps)
+        # Keep the driver queue short so reads return the newest frame
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if not cap.isOpened():
+            cap.release()
+            raise IOError(f"Cannot open camera {self.index}")
+        self._cap = cap
+        logging.info(f"Camera {self.index} opened: {self.negotiated()}")
+
+    def negotiated(self):
+        # What the driver actually agreed to
+        if not self.is_open:
+            return None
+        code = int(self._cap.get(cv2.CAP_PROP_FOURCC))
+        fourcc = "".join(chr((code >> 8 * i) & 0xFF) for i in range(4))
+        return {
+            "width": int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": self._cap.get(cv2.CAP_PROP_FPS),
+            "fourcc": fourcc,
+        }
+
+    def read(self):
+        with self._lock:
+            if not self.is_open:
+                return False, None
+            return self._cap.read()
+
+    def close(self):
+        with self._lock:
+            if self._cap is not None:
+                self._cap.release()
+                self._cap = None
+
+
+class CameraManager:
+
+    def __init__(self):
+        self._cameras = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close_all)
+
+    def acquire(self, index=0, width=640, height=480, fps=30, fourcc="MJPG"):
+        with self._lock:
+            camera = self._cameras.get(index)
+            if camera is None:
+                camera = self._cameras[index] = Camera(index, width, height, fps, fourcc)
+            elif not camera.users and camera.requested != (width, height, fps, fourcc):
+                # Nobody is using it, so reopen with the new format
+                camera.close()
+                camera.requested = (width, height, fps, fourcc)
+            if camera._close_timer is not None:
+                camera._close_timer.cancel()
+                camera._close_timer = None
+            camera.open()
+            camera.users += 1
+            return camera
+
+    def release(self, camera, linger=2.0):
+        with self._lock:
+            camera.users = max(camera.users - 1, 0)
+            if camera.users:
+                return
+            if camera._close_timer is not None:
+                camera._close_timer.cancel()
+                camera._close_timer = None
+            if linger <= 0:
+                camera.close()
+                return
+            camera._close_timer = threading.Timer(linger, self._close_idle, args=(camera,))
+            camera._close_timer.daemon = True
+            camera._close_timer.start()
+
+    def _close_idle(self, camera):
+        with self._lock:
+            if not camera.users:
+                camera._close_timer = None
+                camera.close()
+
+    def close(self, index=0):
+        # Close a lingering handle right away, e.g. when the user presses Stop
+        with self._lock:
+            camera = self._cameras.get(index)
+            if camera is not None and not camera.users:
+                if camera._close_timer is not None:
+                    camera._close_timer.cancel()
+                    camera._close_timer = None
+                camera.close()
+
+    def close_all(self):
+        with self._lock:
+            for camera in self._cameras.values():
+                if camera._close_timer is not None:
+                    camera._close_timer.cancel()
+                camera.users = 0
+                camera.close()
+
+
+CAMERAS = CameraManager()
@@ -0,0 +1,133 @@
+import atexit
+import logging
+import threading
+import time
+
+from frame_stream import STREAMS
+from perf_metrics import METRICS, PerfMetrics
+
+# Background camera sessions for the pose pages. A page builds its pipeline, hands
+# it to SESSIONS under the browser session's key and returns; a worker thread owned
+# by the session moves rendered frames to the MJPEG channel (or keeps the latest
+# one for st.image) while the script thread is free. The page polls the session
+# from a fragment, so Stop takes effect on the next click and an idle browser tab
+# costs nothing on the server. Sessions nobody has polled for a while are stopped.
+# Every session's stage timings are published to METRICS while it runs.
+
+
+class CameraSession:
+
+    def __init__(self, pipeline, channel=None, status=None, cleanup=(), idle_timeout=30.0, metrics=None, labels=None):
+        # status() -> str is called from the worker; cleanup callables run once on stop
+        self.pipeline = pipeline
+        self.channel = channel
+        self.metrics = metrics or PerfMetrics()
+        self.metrics.adopt(pipeline.stats)
+        self.metrics.adopt({"latency": pipeline.latency})
+        if channel is not None:
+            self.metrics.adopt({"encode": channel.encode_stats})
+        self.labels = labels or {}
+        self.frame = None
+        self.status = ""
+        self.done = False
+        self.idle_timeout = idle_timeout
+        self._status = status
+        self._cleanup = list(cleanup)
+        self._seen = time.monotonic()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="camera-session", daemon=True)
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def start(self):
+        self.pipeline.start()
+        self._thread.start()
+        return self
+
+    def finish(self):
+        # Called by page render code when the workout is complete
+        self.done = True
+
+    def touch(self):
+        self._seen = time.monotonic()
+
+    def stop(self, timeout=2.0):
+        self._stopping.set()
+        self.pipeline.stop()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            while not (self._stopping.is_set() or self.done):
+                if time.monotonic() - self._seen > self.idle_timeout:
+                    logging.info("Stopping camera session nobody is watching")
+                    break
+                image = self.pipeline.get(timeout=0.5)
+                if image is None:
+                    break
+                started = time.perf_counter()
+                if self.channel is not None:
+                    self.channel.publish(image)
+                else:
+                    self.frame = image
+                self.metrics.record("handoff", started)
+                if self._status is not None:
+                    self.status = self._status()
+        except Exception as e:
+            logging.error(f"Camera session failed: {e}")
+        finally:
+            self.pipeline.stop()
+            for cleanup in self._cleanup:
+                try:
+                    cleanup()
+                except Exception as e:
+                    logging.error(f"Error while closing camera session: {e}")
+
+
+class SessionRegistry:
+    # One camera session per browser session key, shared by all reruns of the page
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+        atexit.register(self.stop_all)
+
+    def start(self, key, session):
+        self.stop(key)
+        with self._lock:
+            self._sessions[key] = session
+        try:
+            # Serves /metrics even when the video is not streamed
+            STREAMS.start()
+        except OSError:
+            pass
+        METRICS.register(key, session.metrics, session=key[:8], **session.labels)
+        session._cleanup.append(lambda: METRICS.unregister(key, session.metrics))
+        return session.start()
+
+    def get(self, key):
+        with self._lock:
+            return self._sessions.get(key)
+
+    def pop(self, key):
+        # Take a finished session out so the page can report on it once
+        with self._lock:
+            return self._sessions.pop(key, None)
+
+    def stop(self, key):
+        session = self.pop(key)
+        if session is not None:
+            session.stop()
+        return session
+
+    def stop_all(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.stop()
+
+
+SESSIONS = SessionRegistry()
@@ -0,0 +1,101 @@
+import bisect
+import re
+
+import numpy as np
+
+# Server-side search over the USDA short descriptions ("CHEESE,CHEDDAR",
+# "BEANS,SNAP,GRN,RAW"...). Descriptions are split into words on commas and
+# spaces; a query word scores when it is a prefix of a description word (found by
+# binary search over the sorted word list) and, to tolerate typos and abbreviations,
+# by the trigrams it shares with the description (summed from posting lists with one
+# bincount). Only the top K rows go to the browser instead of every description.
+
+_WORD = re.compile(r"[A-Z0-9%]+")
+
+
+def words(text):
+    return _WORD.findall(text.upper())
+
+
+def trigrams(word):
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodSearch:
+
+    def __init__(self, descriptions):
+        self.descriptions = list(descriptions)
+        self._lengths = np.array([len(d) for d in self.descriptions], dtype=np.float32)
+
+        pairs = sorted({(word, row) for row, d in enumerate(self.descriptions) for word in words(d)})
+        self._words = [word for word, _ in pairs]
+        self._word_rows = np.array([row for _, row in pairs], dtype=np.int32)
+        # The first word is the food itself ("EGG,WHL,DRIED" vs "BREAD,EGG")
+        heads = sorted((words(d)[0], row) for row, d in enumerate(self.descriptions) if words(d))
+        self._heads = [word for word, _ in heads]
+        self._head_rows = np.array([row for _, row in heads], dtype=np.int32)
+        postings = {}
+        for row, d in enumerate(self.descriptions):
+            grams = set()
+            for word in words(d):
+                grams |= trigrams(word)
+            for gram in grams:
+                postings.setdefault(gram, []).append(row)
+        self._postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+
+    @staticmethod
+    def _prefix_rows(sorted_words, rows, word, exact=False):
+        start = bisect.bisect_left(sorted_words, word)
+        end = bisect.bisect_right(sorted_words, word, start) if exact else \
+            bisect.bisect_left(sorted_words, word + "\uffff", start)
+        return rows[start:end]
+
+    def word_hits(self, query_words, heads=False, exact=False):
+        # (query words, descriptions) whether each word prefixes (exact: is) a word
+        # (heads: the first word) of each description
+        sorted_words, rows = (self._heads, self._head_rows) if heads else (self._words, self._word_rows)
+        hits = np.zeros((len(query_words), len(self.descriptions)), dtype=bool)
+        for k, word in enumerate(query_words):
+            hits[k, self._prefix_rows(sorted_words, rows, word, exact)] = True
+        return hits
+
+    def scores(self, query):
+        # (descriptions,) relevance of every row for the query
+        n = len(self.descriptions)
+        score = np.zeros(n, dtype=np.float32)
+        query_words = words(query)
+        if not query_words:
+            return score
+        unmatched = []
+        for word in query_words:
+            # A query word that prefixes a description word is worth more than any trigram
+            # overlap, a whole-word match a little more
+            rows = self._prefix_rows(self._words, self._word_rows, word)
+            if not len(rows):
+                unmatched.append(word)
+            score[np.unique(rows)] += 1.5
+            score[np.unique(self._prefix_rows(self._words, self._word_rows, word, exact=True))] += 0.25
+        score[self._prefix_rows(self._heads, self._head_rows, query_words[0])] += 0.5
+
+        # Trigrams carry the words nothing starts with (typos, other spellings)
+        grams = set()
+        for word in unmatched:
+            grams |= trigrams(word)
+        hits = [self._postings[gram] for gram in grams if gram in self._postings]
+        if hits:
+            score += np.bincount(np.concatenate(hits), minlength=n) / len(grams)
+        return score
+
+    def top(self, query, k=25):
+        # Best k descriptions, shorter ones first among equal scores
+        score = self.scores(query)
+        # Trigram overlap alone has to cover over a third of the unmatched words to count
+        candidates = np.flatnonzero(score > 0.34)
+        if not len(candidates):
+            return []
+        ranked = score[candidates] - self._lengths[candidates] * 1e-4
+        if len(candidates) > k:
+            keep = np.argpartition(-ranked, k - 1)[:k]
+            candidates, ranked = candidates[keep], ranked[keep]
+        return [self.descriptions[row] for row in candidates[np.argsort(-ranked, kind="stable")]]
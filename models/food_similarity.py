@@ -0,0 +1,50 @@
+import numpy as np
+
+from food_search import words
+
+# "Foods like this" over the nutrient profiles. Every USDA row is turned once into a
+# standardized float32 vector (log1p of the per-100 g values, then zero mean / unit
+# variance per nutrient, so grams of fat and µg of vitamin K weigh the same); the
+# nearest foods to a selected one are then a single matrix-vector product against the
+# whole table plus an argpartition, with the category and calorie limits applied as
+# masks before ranking.
+
+
+class FoodSimilarity:
+
+    def __init__(self, store, columns=None):
+        self.store = store
+        values = np.asarray(store.matrix if columns is None else store.matrix[:, store.cols(columns)], dtype=np.float64)
+        # Nutrient amounts are heavily skewed; log1p keeps a few huge values from deciding everything
+        values = np.log1p(np.maximum(values, 0))
+        std = values.std(axis=0)
+        std[std == 0] = 1
+        self.vectors = np.ascontiguousarray((values - values.mean(axis=0)) / std, dtype=np.float32)
+        self._norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        # The first word of a description is the kind of food ("CHEESE", "SOUP", "OIL")
+        self.categories = np.array([(words(d) or [""])[0] for d in store.descriptions], dtype=object)
+        self.serving_kcal = np.asarray(store.matrix[:, store.column_index["Energ_Kcal"]]) * store.serving_grams / 100
+
+    def category(self, food):
+        return self.categories[self.store.row(food)]
+
+    def distances(self, row):
+        # (foods,) squared distance of every profile to the one of `row`
+        query = self.vectors[row]
+        return np.maximum(self._norms - 2 * (self.vectors @ query) + self._norms[row], 0)
+
+    def similar(self, food, k=10, category=None, max_kcal=None):
+        # -> [(description, distance), ...] of the k closest other foods, closest first;
+        # max_kcal is per serving, category a first description word
+        row = self.store.row(food)
+        distance = self.distances(row)
+        allowed = self.store.descriptions != self.store.descriptions[row]
+        if category:
+            allowed &= self.categories == category.upper()
+        if max_kcal is not None:
+            allowed &= self.serving_kcal <= max_kcal
+        candidates = np.flatnonzero(allowed)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(distance[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(distance[candidates], kind="stable")]
+        return [(self.store.descriptions[c], float(np.sqrt(distance[c]))) for c in candidates]
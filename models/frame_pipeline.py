@@ -0,0 +1,176 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+# Threaded capture -> inference -> render pipeline for the pose pages.
+# Each stage runs on its own thread and the stages are joined by bounded
+# queues that drop the oldest frame when full, so a slow stage never builds
+# up lag: downstream stages always work on the freshest frame available.
+
+
+class LatestQueue:
+    # Bounded queue that drops the oldest item instead of blocking the producer
+
+    def __init__(self, maxsize=1):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, item):
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class StageStats:
+    # Rolling frame rate and processing time of one stage
+
+    def __init__(self, window=30):
+        self._stamps = deque(maxlen=window)
+        self._durations = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, started, finished):
+        with self._lock:
+            self._stamps.append(finished)
+            self._durations.append(finished - started)
+            self.count += 1
+
+    @property
+    def fps(self):
+        with self._lock:
+            if len(self._stamps) < 2:
+                return 0.0
+            span = self._stamps[-1] - self._stamps[0]
+            return (len(self._stamps) - 1) / span if span > 0 else 0.0
+
+    @property
+    def ms(self):
+        with self._lock:
+            if not self._durations:
+                return 0.0
+            return 1000.0 * sum(self._durations) / len(self._durations)
+
+
+class FramePipeline:
+    """Run read/infer/render on three threads joined by stale-frame-dropping queues.
+
+    read() -> (ok, frame), infer(frame) -> results and render(frame, results) -> image
+    are plain callables, so each page keeps its own rules and drawing.
+    get() returns the most recent rendered image, or None once the pipeline has stopped.
+    """
+
+    STAGES = ("capture", "inference", "render")
+
+    def __init__(self, read, infer, render, queue_size=1):
+        self._read = read
+        self._infer = infer
+        self._render = render
+        self._captured = LatestQueue(queue_size)
+        self._inferred = LatestQueue(queue_size)
+        self._rendered = LatestQueue(queue_size)
+        self._running = threading.Event()
+        self._threads = []
+        self.stats = {name: StageStats() for name in self.STAGES}
+        self.latency = StageStats()
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    def start(self):
+        if self.running:
+            return self
+        self._running.set()
+        targets = (self._capture_loop, self._inference_loop, self._render_loop)
+        self._threads = [threading.Thread(target=target, name=f"pose-{name}", daemon=True)
+                         for name, target in zip(self.STAGES, targets)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._running.clear()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._threads = []
+
+    def get(self, timeout=1.0):
+        # Latest rendered image; keeps waiting while the pipeline is alive
+        while True:
+            item = self._rendered.get(timeout=timeout)
+            if item is not None:
+                return item
+            if not self.running:
+                return None
+
+    @property
+    def dropped(self):
+        return self._captured.dropped + self._inferred.dropped + self._rendered.dropped
+
+    def summary(self):
+        parts = [f"{name}: {stage.fps:.1f} fps / {stage.ms:.1f} ms" for name, stage in self.stats.items()]
+        parts.append(f"latency: {self.latency.ms:.1f} ms")
+        parts.append(f"dropped: {self.dropped}")
+        return " | ".join(parts)
+
+    def _capture_loop(self):
+        while self.running:
+            started = time.perf_counter()
+            ok, frame = self._read()
+            if not ok:
+                logging.error("Unable to read from camera. Please check your webcam.")
+                self._running.clear()
+                break
+            finished = time.perf_counter()
+            self.stats["capture"].record(started, finished)
+            self._captured.put((finished, frame))
+
+    def _inference_loop(self):
+        while self.running:
+            item = self._captured.get(timeout=0.1)
+            if item is None:
+                continue
+            captured_at, frame = item
+            started = time.perf_counter()
+            try:
+                results = self._infer(frame)
+            except Exception as e:
+                logging.error(f"Error in pose inference: {e}")
+                continue
+            self.stats["inference"].record(started, time.perf_counter())
+            self._inferred.put((captured_at, frame, results))
+
+    def _render_loop(self):
+        while self.running:
+            item = self._inferred.get(timeout=0.1)
+            if item is None:
+                continue
+            captured_at, frame, results = item
+            started = time.perf_counter()
+            try:
+                image = self._render(frame, results)
+            except Exception as e:
+                logging.error(f"Error in frame rendering: {e}")
+                continue
+            finished = time.perf_counter()
+            self.stats["render"].record(started, finished)
+            self.latency.record(captured_at, finished)
+            if image is not None:
+                self._rendered.put(image)
@@ -0,0 +1,211 @@
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+from frame_pipeline import StageStats
+from perf_metrics import METRICS
+
+# MJPEG transport for the pose pages. Instead of pushing every raw frame through
+# st.image, the render stage publishes frames to a channel; a worker encodes the
+# latest one to JPEG at a capped rate (only while someone is watching) and a small
+# HTTP server streams it as multipart/x-mixed-replace. A client that falls behind
+# simply gets the newest JPEG next, never a backlog. The same server answers
+# /metrics with the live sessions' stage timings in Prometheus text format.
+#
+# The server has no authentication, so it only listens on localhost unless
+# DADHICHI_STREAM_HOST says otherwise. Behind an HTTPS proxy, set DADHICHI_STREAM_URL
+# to the public address it is proxied at, so the page never embeds an http:// URL.
+
+STREAM_HOST = os.getenv("DADHICHI_STREAM_HOST", "127.0.0.1")
+STREAM_PORT = int(os.getenv("DADHICHI_STREAM_PORT", "8502"))
+STREAM_URL = os.getenv("DADHICHI_STREAM_URL", "")
+# Whether browsers on other machines can reach the stream; the pages only stream by default then
+STREAM_PUBLIC = bool(os.getenv("DADHICHI_STREAM_HOST") or STREAM_URL)
+BOUNDARY = "dadhichiframe"
+
+
+class StreamChannel:
+
+    def __init__(self, name, max_fps=15, quality=70):
+        self.name = name
+        self.max_fps = max_fps
+        self.quality = quality
+        self.clients = 0
+        self._clients_lock = threading.Lock()
+        self.sent = 0
+        self.skipped = 0
+        self._frame = None
+        self._jpeg = None
+        self._sequence = 0
+        self._closed = False
+        self.encode_stats = StageStats()
+        self._new_frame = threading.Condition()
+        self._new_jpeg = threading.Condition()
+        self._worker = threading.Thread(target=self._encode_loop, name=f"stream-{name}", daemon=True)
+        self._worker.start()
+
+    def publish(self, image):
+        # Called from the render stage; never blocks on encoding or the network
+        with self._new_frame:
+            if self._frame is not None:
+                self.skipped += 1
+            self._frame = image
+            self._new_frame.notify()
+
+    def attach(self, delta):
+        # Handler threads connect and disconnect concurrently
+        with self._clients_lock:
+            self.clients += delta
+
+    def close(self):
+        self._closed = True
+        with self._new_frame:
+            self._new_frame.notify_all()
+        with self._new_jpeg:
+            self._new_jpeg.notify_all()
+
+    def _encode_loop(self):
+        last = 0.0
+        while not self._closed:
+            with self._new_frame:
+                while self._frame is None and not self._closed:
+                    self._new_frame.wait(0.5)
+                image, self._frame = self._frame, None
+            if image is None or not self.clients:
+                continue
+            wait = 1.0 / self.max_fps - (time.perf_counter() - last)
+            if wait > 0:
+                time.sleep(wait)
+                # A newer frame may have arrived while sleeping
+                with self._new_frame:
+                    if self._frame is not None:
+                        image, self._frame = self._frame, None
+            started = time.perf_counter()
+            ok, jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)])
+            last = time.perf_counter()
+            self.encode_stats.record(started, last)
+            if ok:
+                with self._new_jpeg:
+                    self._jpeg = jpeg.tobytes()
+                    self._sequence += 1
+                    self._new_jpeg.notify_all()
+
+    def frames(self):
+        # Generator of the latest JPEG for one client; skips whatever it missed
+        seen = 0
+        while not self._closed:
+            with self._new_jpeg:
+                while self._sequence == seen and not self._closed:
+                    self._new_jpeg.wait(1.0)
+                if self._closed:
+                    return
+                seen, jpeg = self._sequence, self._jpeg
+            yield jpeg
+
+
+class _StreamHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?")[0].rstrip("/") == "/metrics":
+            body = METRICS.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        name = self.path.strip("/").split("/")[-1].split("?")[0]
+        channel = self.server.channels.get(name)
+        if channel is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        channel.attach(1)
+        try:
+            for jpeg in channel.frames():
+                self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode())
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+                channel.sent += 1
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            channel.attach(-1)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StreamServer:
+    # One HTTP server per process, started on first use
+
+    def __init__(self, host=STREAM_HOST, port=STREAM_PORT, public_url=STREAM_URL):
+        self.host = host
+        self.port = port
+        self.public_url = public_url.rstrip("/")
+        self.channels = {}
+        self._server = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._server is not None:
+            return
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), _StreamHandler)
+        except OSError as e:
+            logging.error(f"Cannot start video stream server on {self.host}:{self.port}: {e}")
+            raise
+        self._server.daemon_threads = True
+        self._server.channels = self.channels
+        threading.Thread(target=self._server.serve_forever, name="stream-server", daemon=True).start()
+
+    def start(self):
+        with self._lock:
+            self._ensure_started()
+
+    def channel(self, name, max_fps=15, quality=70):
+        with self._lock:
+            self._ensure_started()
+            channel = self.channels.get(name)
+            if channel is None:
+                channel = self.channels[name] = StreamChannel(name, max_fps, quality)
+            channel.max_fps, channel.quality = max_fps, quality
+            return channel
+
+    def close(self, name):
+        with self._lock:
+            channel = self.channels.pop(name, None)
+        if channel is not None:
+            channel.close()
+
+    def base_url(self, headers=None):
+        # Where the browser reaches the server: DADHICHI_STREAM_URL, else the page's own
+        # host and scheme (from the Origin / X-Forwarded-Proto of the page's request)
+        if self.public_url:
+            return self.public_url
+        headers = headers or {}
+        host = headers.get("Host", "localhost").split(":")[0]
+        origin = headers.get("Origin", "")
+        https = origin.startswith("https:") or headers.get("X-Forwarded-Proto", "") == "https"
+        return f"{'https' if https else 'http'}://{host}:{self.port}"
+
+    def url(self, name, headers=None):
+        return f"{self.base_url(headers)}/stream/{name}"
+
+    def metrics_url(self, headers=None):
+        return f"{self.base_url(headers)}/metrics"
+
+
+STREAMS = StreamServer()
+
+
+def stream_html(url):
+    # The browser pulls the MJPEG stream itself; Streamlit only renders this tag once
+    return f'<img src="{url}" style="width:100%;" />'
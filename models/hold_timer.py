@@ -0,0 +1,45 @@
+# Hold-timer state machine for the Yoga tracks. Driven by frame timestamps from a
+# monotonic clock (time.perf_counter), so hold durations do not depend on the frame
+# rate or on wall-clock seconds ticking over.
+
+
+class HoldTimer:
+    """Walk through a sequence of poses, each of which has to be held for holds[i] seconds.
+
+    update(correct, timestamp) is called once per frame with the verdict for the
+    current pose; on_advance(index) fires when a hold completes (e.g. to ring the bell).
+    """
+
+    def __init__(self, holds, on_advance=None):
+        self.holds = list(holds)
+        self.on_advance = on_advance
+        self.reset()
+
+    def reset(self):
+        self.index = 0
+        self.since = None
+        self.held = 0.0
+
+    @property
+    def done(self):
+        return self.index >= len(self.holds)
+
+    def update(self, correct, timestamp):
+        # Returns True on the frame the current pose's hold completes
+        if self.done:
+            return False
+        if not correct:
+            self.since = None
+            self.held = 0.0
+            return False
+        if self.since is None:
+            self.since = timestamp
+        self.held = timestamp - self.since
+        if self.held < self.holds[self.index]:
+            return False
+        self.index += 1
+        self.since = None
+        self.held = 0.0
+        if self.on_advance is not None:
+            self.on_advance(self.index)
+        return True
@@ -0,0 +1,91 @@
+import cv2
+import numpy as np
+
+# Cached HUD compositing for the pose pages. Static panels and text are rasterized
+# into an overlay layer only when a value changes; every frame the cached layer is
+# alpha-blended onto the camera image in one vectorized operation over its bounding box.
+
+
+class HudOverlay:
+
+    def __init__(self):
+        self._panels = []
+        self._texts = {}
+        self._size = None
+        self._dirty = True
+        self._box = None
+        self._premultiplied = None
+        self._inverse_alpha = None
+
+    def panel(self, rect, color):
+        # Static filled rectangle ((x0, y0), (x1, y1)); set once when the page is set up
+        self._panels.append((rect, color))
+        self._dirty = True
+
+    def text(self, key, value, org, scale, color, thickness=2, line_type=cv2.LINE_8):
+        # Only marks the layer dirty when what would be drawn actually changes
+        spec = (str(value), tuple(org), scale, tuple(color), thickness, line_type)
+        if self._texts.get(key) != spec:
+            self._texts[key] = spec
+            self._dirty = True
+
+    def hide(self, key):
+        if self._texts.pop(key, None) is not None:
+            self._dirty = True
+
+    def _rebuild(self, size):
+        h, w = size
+        # Float premultiplied layer; every panel and text is laid "over" what is below it
+        # by its own coverage, so anti-aliased edges blend like putText on the image
+        color = np.zeros((h, w, 3), dtype=np.float32)
+        alpha = np.zeros((h, w), dtype=np.float32)
+        coverage = np.zeros((h, w), dtype=np.uint8)
+
+        def over(fill):
+            x, y, bw, bh = cv2.boundingRect(coverage)
+            if bw and bh:
+                a = coverage[y:y + bh, x:x + bw].astype(np.float32) / 255
+                color[y:y + bh, x:x + bw] = color[y:y + bh, x:x + bw] * (1 - a[..., None]) + np.multiply.outer(a, fill)
+                alpha[y:y + bh, x:x + bw] += (1 - alpha[y:y + bh, x:x + bw]) * a
+                coverage[y:y + bh, x:x + bw] = 0
+
+        for (top_left, bottom_right), fill in self._panels:
+            cv2.rectangle(coverage, top_left, bottom_right, 255, -1)
+            over(fill)
+        for value, org, scale, fill, thickness, line_type in self._texts.values():
+            cv2.putText(coverage, value, org, cv2.FONT_HERSHEY_SIMPLEX, scale, 255, thickness, line_type)
+            over(fill)
+
+        self._size = size
+        self._dirty = False
+        x0, y0, bw, bh = cv2.boundingRect((alpha > 0).view(np.uint8))
+        if not (bw and bh):
+            self._box = None
+            return
+        y1, x1 = y0 + bh, x0 + bw
+        # 8-bit premultiplied layer; blending stays in saturating uint8 arithmetic
+        self._box = (y0, y1, x0, x1)
+        self._premultiplied = np.rint(color[y0:y1, x0:x1]).astype(np.uint8)
+        self._inverse_alpha = cv2.merge([np.rint(255 * (1 - alpha[y0:y1, x0:x1])).astype(np.uint8)] * 3)
+
+    def apply(self, image):
+        if self._dirty or self._size != image.shape[:2]:
+            self._rebuild(image.shape[:2])
+        if self._box is not None:
+            y0, y1, x0, x1 = self._box
+            roi = image[y0:y1, x0:x1]
+            cv2.add(cv2.multiply(roi, self._inverse_alpha, scale=1 / 255), self._premultiplied, dst=roi)
+        return image
+
+
+def draw_skeleton(image, points, connections, point_color, line_color, min_visibility=0.5, thickness=2, radius=2):
+    # All bones in one polylines call instead of draw_landmarks' per-connection loop
+    h, w = image.shape[:2]
+    pixels = np.rint(points[:, :2] * (w, h)).astype(np.int32)
+    visible = points[:, 3] >= min_visibility
+    bones = [pixels[[a, b]] for a, b in connections if visible[a] and visible[b]]
+    if bones:
+        cv2.polylines(image, bones, False, line_color, thickness)
+    for x, y in pixels[visible]:
+        cv2.circle(image, (int(x), int(y)), radius, point_color, -1)
+    return image
@@ -0,0 +1,108 @@
+import argparse
+import logging
+
+import numpy as np
+import pandas as pd
+
+from nutrient_store import FOOD_TABLE, MEAL_NUTRIENTS, get_store
+
+# Batched nutrition totals, for food logs and for the Nutrition page's meal (one group
+# per dish). Every entry is one non-zero of a sparse (meals, foods) matrix holding its
+# servings, so the totals of all meals for every nutrient are a single sparse product
+# with the store's nutrient matrix. scipy does the product when installed; otherwise
+# the entries are sorted by meal and summed with np.add.reduceat, which is the same CSR
+# product written out.
+#
+#   python meal_log.py logs/*.csv --out daily_totals.csv
+#
+# Input columns: user, date, food (Shrt_Desc or NDB_No), servings. A serving is the
+# food's household portion (NutrientStore.serving), as on the page, not the 100 g row.
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+LOG_COLUMNS = ("user", "date", "food", "servings")
+
+
+def meal_totals(store, groups, rows, servings, n_groups=None, columns=None):
+    # groups / rows / servings: one entry per logged food -> (groups, columns) totals
+    groups = np.asarray(groups, dtype=np.intp)
+    rows = np.asarray(rows, dtype=np.intp)
+    # Servings -> multiples of the per-100 g rows
+    servings = np.asarray(servings, dtype=np.float64) * store.serving_grams[rows] / 100
+    n_groups = int(groups.max()) + 1 if n_groups is None and len(groups) else (n_groups or 0)
+    matrix = store.matrix if columns is None else store.matrix[:, store.cols(columns)]
+    if sparse is not None:
+        weights = sparse.csr_matrix((servings, (groups, rows)), shape=(n_groups, len(store)))
+        return np.asarray(weights @ np.asarray(matrix))
+    order = np.argsort(groups, kind="stable")
+    groups, rows, servings = groups[order], rows[order], servings[order]
+    totals = np.zeros((n_groups, matrix.shape[1]))
+    if len(groups):
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        totals[groups[starts]] = np.add.reduceat(np.asarray(matrix)[rows] * servings[:, None], starts, axis=0)
+    return totals
+
+
+def dish_totals(store, foods, servings, columns=MEAL_NUTRIENTS):
+    # The page's meal -> (dishes, columns) values for each dish and the (columns,) totals
+    rows = store.rows(foods)
+    per_dish = meal_totals(store, np.arange(len(rows)), rows, servings, n_groups=len(rows), columns=columns)
+    return per_dish, per_dish.sum(axis=0)
+
+
+def resolve_foods(store, foods):
+    # Shrt_Desc (as listed or upper case) or NDB_No -> row index, -1 when unknown
+    rows = np.full(len(foods), -1, dtype=np.intp)
+    for k, food in enumerate(foods):
+        if isinstance(food, str):
+            text = food.strip()
+            row = store.by_description.get(text, store.by_description.get(text.upper()))
+            if row is None and text.replace(".", "", 1).isdigit():
+                row = store.by_ndb.get(int(float(text)))
+        else:
+            row = store.by_ndb.get(int(food))
+        if row is not None:
+            rows[k] = row
+    return rows
+
+
+def daily_totals(log, store=None, columns=None):
+    # log: DataFrame with LOG_COLUMNS -> one row of nutrient totals per (user, date)
+    store = store or get_store()
+    missing = [c for c in LOG_COLUMNS if c not in log]
+    if missing:
+        raise ValueError(f"Meal log is missing columns: {', '.join(missing)}")
+    rows = resolve_foods(store, log["food"].tolist())
+    known = rows >= 0
+    if not known.all():
+        unknown = log.loc[~known, "food"].astype(str).unique()
+        logging.warning(f"Skipping {int((~known).sum())} entries with unknown foods: {', '.join(unknown[:10])}")
+    log = log.loc[known]
+    groups, days = pd.factorize(pd.MultiIndex.from_frame(log[["user", "date"]].astype(str)), sort=True)
+    totals = meal_totals(store, groups, rows[known], log["servings"].to_numpy(np.float64),
+                         n_groups=len(days), columns=columns)
+    table = pd.DataFrame(totals, columns=list(columns or store.columns))
+    table.insert(0, "date", days.get_level_values(1))
+    table.insert(0, "user", days.get_level_values(0))
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daily nutrient totals from food logs")
+    parser.add_argument("logs", nargs="+", help="CSV files with user, date, food, servings columns")
+    parser.add_argument("--out", default="daily_totals.csv")
+    parser.add_argument("--foods", default=FOOD_TABLE, help="USDA nutrient table")
+    parser.add_argument("--columns", nargs="*", help="nutrient columns to total (default: all)")
+    args = parser.parse_args()
+
+    log = pd.concat([pd.read_csv(path) for path in args.logs], ignore_index=True)
+    table = daily_totals(log, get_store(args.foods), args.columns)
+    table.to_csv(args.out, index=False)
+    print(f"{len(log)} entries -> {len(table)} user-days in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import re
+
+import numpy as np
+
+# Macro-target meal planning over the whole nutrient matrix. Starting from an empty
+# plan, every step scores "add one step of food i" and "remove one step of food i"
+# for all 8.8k foods at once as a (foods, nutrients) array operation and applies the
+# best move, until nothing brings the totals closer to the targets. A plan is a
+# handful of foods, so this finishes in a few dozen vectorized steps.
+
+# Page name -> nutrient column
+TARGET_COLUMNS = {
+    "calories": "Energ_Kcal",
+    "protein": "Protein_(g)",
+    "carbs": "Carbohydrt_(g)",
+    "fat": "Lipid_Tot_(g)",
+    "sugar": "Sugar_Tot_(g)",
+    "calcium": "Calcium_(mg)",
+}
+
+# A zero target has no relative error; the distance from zero is measured in these amounts
+ZERO_TARGET_SCALE = {
+    "calories": 100.0,
+    "protein": 10.0,
+    "carbs": 10.0,
+    "fat": 10.0,
+    "sugar": 10.0,
+    "calcium": 100.0,
+}
+
+# Rows that are never part of a meal plan: baby food, formula, Alaska Native foods
+_NOT_PLANNED = re.compile(r"^BABYFOOD|FORMULA|ALASKA NATIVE")
+
+
+def _error(totals, targets, scales, weights):
+    # Weighted squared relative error (relative to scales, the targets themselves except
+    # for zero targets); works on (nutrients,) and (foods, nutrients)
+    return np.sum(weights * ((totals - targets) / scales) ** 2, axis=-1)
+
+
+def solve_meal(store, targets, weights=None, max_foods=5, step=0.5, max_servings=4.0,
+               candidates=None, exclude=(), max_steps=200):
+    """Propose servings (in the store's per-100 g units) whose totals approach `targets`.
+
+    targets maps TARGET_COLUMNS keys to amounts (0 means none of it); unlisted
+    nutrients are free. candidates limits the search to those foods (descriptions or
+    NDB_No); by default it is the everyday foods that have a household serving.
+    Returns ([(description, servings), ...], {name: total}).
+    """
+    names = [name for name in TARGET_COLUMNS if targets.get(name) is not None]
+    if not names:
+        raise ValueError("At least one nutrient target is required")
+    goal = np.array([targets[name] for name in names], dtype=np.float64)
+    scale = np.where(goal > 0, goal, [ZERO_TARGET_SCALE[name] for name in names])
+    weight = np.array([(weights or {}).get(name, 1.0) for name in names], dtype=np.float64)
+    values = np.asarray(store.matrix[:, store.cols([TARGET_COLUMNS[name] for name in names])], dtype=np.float64)
+    moves = values * step
+
+    # Foods that contribute nothing to the targets never help
+    allowed = values.any(axis=1)
+    allowed &= np.array([not _NOT_PLANNED.search(d) for d in store.descriptions])
+    if candidates is None and store.common.any():
+        allowed &= store.common
+    elif candidates is not None:
+        listed = np.zeros(len(values), dtype=bool)
+        listed[store.rows(list(candidates))] = True
+        allowed &= listed
+    for food in exclude:
+        allowed[store.row(food)] = False
+
+    servings = np.zeros(len(values))
+    totals = np.zeros(len(names))
+    error = _error(totals, goal, scale, weight)
+    for _ in range(max_steps):
+        chosen = servings > 0
+        can_add = allowed & (servings + step <= max_servings)
+        if chosen.sum() >= max_foods:
+            can_add &= chosen
+        add = np.where(can_add, _error(totals + moves, goal, scale, weight), np.inf)
+        remove = np.where(chosen, _error(totals - moves, goal, scale, weight), np.inf)
+        best_add, best_remove = int(add.argmin()), int(remove.argmin())
+        if min(add[best_add], remove[best_remove]) >= error - 1e-9:
+            break
+        if add[best_add] <= remove[best_remove]:
+            servings[best_add] += step
+            totals += moves[best_add]
+            error = add[best_add]
+        else:
+            servings[best_remove] -= step
+            totals -= moves[best_remove]
+            error = remove[best_remove]
+
+    rows = np.flatnonzero(servings)
+    plan = [(store.descriptions[row], float(servings[row])) for row in rows[np.argsort(-servings[rows])]]
+    return plan, dict(zip(names, totals.tolist()))
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from food_search import FoodSearch
+from food_similarity import FoodSimilarity
+
+# Indexed nutrient lookups for the Nutrition page. food1.csv (USDA per-100 g rows) is
+# read once per process; the nutrient columns are kept as one contiguous float matrix
+# and rows are found through dicts keyed by Shrt_Desc and NDB_No, instead of a boolean
+# scan of the whole table per dish and nutrient. Meal totals are meal_log.meal_totals,
+# shared by the page and the food-log CLI.
+#
+# Parsing the CSV dominates page start-up, so the parsed columns are cached in a
+# binary form (.npy arrays plus a JSON string table) next to it. The cache is rebuilt
+# when the CSV's size / mtime and content hash change, and the nutrient matrix is
+# memory-mapped, so every process shares the same pages of it.
+#
+# A serving of a food is its household portion from food_servings.csv (built by
+# serving_sizes.py from food.csv), else USDA's first listed weight (GmWt_1), else 100 g.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FOOD_TABLE = os.path.join(HERE, "food1.csv")
+CACHE_DIR = os.path.join(HERE, ".cache")
+SERVING_TABLE = os.path.join(HERE, "food_servings.csv")
+CACHE_VERSION = 1
+
+# Non-nutrient columns of food1.csv
+KEY_COLUMNS = ("NDB_No", "Shrt_Desc")
+WEIGHT_COLUMNS = ("GmWt_1", "GmWt_2", "Refuse_Pct")
+
+# What the page reports for every meal
+MEAL_NUTRIENTS = ("Energ_Kcal", "Protein_(g)", "Carbohydrt_(g)", "Lipid_Tot_(g)", "Sugar_Tot_(g)", "Calcium_(mg)")
+
+# The "µ" in the µg headers is stored as a UTF-8 replacement character, which the
+# mac_roman read turns into three characters
+_MANGLED_MICRO = ("\u00d4\u00f8\u03a9", "\ufffd")
+
+
+def clean_column(name):
+    for mangled in _MANGLED_MICRO:
+        name = name.replace(mangled, "µ")
+    return name
+
+
+class NutrientStore:
+
+    def __init__(self, ndb, descriptions, columns, matrix, weights, source_stamp=None):
+        self.ndb = ndb
+        self.descriptions = descriptions
+        self.columns = tuple(columns)
+        self.column_index = {name: i for i, name in enumerate(self.columns)}
+        self.matrix = matrix
+        self.weights = weights
+        self.source_stamp = source_stamp
+        # A few descriptions repeat; the first row wins, as with the old df[...].values[0]
+        self.by_description = {}
+        for row, description in enumerate(self.descriptions):
+            self.by_description.setdefault(description, row)
+        self.by_ndb = {int(ndb): row for row, ndb in enumerate(self.ndb)}
+        # Unique descriptions in file order, for the food selectboxes
+        self.foods = tuple(self.by_description)
+        self._search = None
+        self._similarity = None
+        self.set_servings(None)
+
+    @classmethod
+    def from_table(cls, table, source_stamp=None):
+        table = table.rename(columns=clean_column)
+        columns = [c for c in table.columns if c not in KEY_COLUMNS + WEIGHT_COLUMNS]
+        return cls(table["NDB_No"].to_numpy(np.int64),
+                   table["Shrt_Desc"].to_numpy(object),
+                   columns,
+                   np.ascontiguousarray(table[columns].to_numpy(np.float64)),
+                   np.ascontiguousarray(table[[c for c in WEIGHT_COLUMNS if c in table]].to_numpy(np.float64)),
+                   source_stamp)
+
+    @classmethod
+    def from_csv(cls, path=FOOD_TABLE):
+        return cls.from_table(pd.read_csv(path, encoding="mac_roman"), _stamp(path))
+
+    def set_servings(self, table):
+        # table: food_servings.csv rows (NDB_No, Serving, Grams); the first one per food wins
+        gm_wt = self.weights[:, 0] if self.weights.shape[1] else np.full(len(self), np.nan)
+        self.serving_grams = np.where(gm_wt > 0, gm_wt, 100.0)
+        self.serving_labels = np.array([f"{grams:g} g" for grams in self.serving_grams], dtype=object)
+        # Rows matched to an everyday food of food.csv
+        self.common = np.zeros(len(self), dtype=bool)
+        if table is None:
+            return
+        self._similarity = None
+        for ndb, label, grams in list(zip(table["NDB_No"], table["Serving"], table["Grams"]))[::-1]:
+            row = self.by_ndb.get(int(ndb))
+            if row is not None and grams > 0:
+                self.serving_grams[row] = grams
+                self.serving_labels[row] = label
+                self.common[row] = True
+
+    @classmethod
+    def load(cls, path=FOOD_TABLE, cache_dir=CACHE_DIR, servings=SERVING_TABLE):
+        store = cls._load(path, cache_dir)
+        if os.path.exists(servings):
+            store.set_servings(pd.read_csv(servings, usecols=["NDB_No", "Serving", "Grams"]))
+        return store
+
+    @classmethod
+    def _load(cls, path, cache_dir):
+        # From the binary cache when it matches the CSV, otherwise parse and rebuild it
+        prefix = os.path.join(cache_dir, os.path.splitext(os.path.basename(path))[0])
+        stamp = _stamp(path)
+        manifest = _read_manifest(prefix)
+        if manifest is not None and manifest["stamp"] != stamp and manifest["sha256"] == _sha256(path):
+            # Touched but unchanged: keep the cache, remember the new mtime
+            manifest["stamp"] = stamp
+            try:
+                _write_json(f"{prefix}.json", manifest)
+            except OSError as e:
+                logging.warning(f"Could not update the nutrient cache {prefix}.json: {e}")
+        if manifest is not None and manifest["stamp"] == stamp:
+            try:
+                return cls(np.load(f"{prefix}.ndb.npy"),
+                           np.array(manifest["descriptions"], dtype=object),
+                           manifest["columns"],
+                           np.load(f"{prefix}.matrix.npy", mmap_mode="r"),
+                           np.load(f"{prefix}.weights.npy"),
+                           stamp)
+            except (OSError, ValueError):
+                pass
+        store = cls.from_csv(path)
+        try:
+            store.save(prefix, _sha256(path))
+        except OSError as e:
+            # Read-only or full disk: serve from memory, parse the CSV again next start
+            logging.warning(f"Could not write the nutrient cache {prefix}: {e}")
+        return store
+
+    def save(self, prefix, sha256):
+        os.makedirs(os.path.dirname(prefix), exist_ok=True)
+        for name, array in (("ndb", self.ndb), ("matrix", self.matrix), ("weights", self.weights)):
+            _write_npy(f"{prefix}.{name}.npy", array)
+        # Written last: a manifest only exists for a complete cache
+        _write_json(f"{prefix}.json", {
+            "version": CACHE_VERSION,
+            "stamp": self.source_stamp,
+            "sha256": sha256,
+            "columns": list(self.columns),
+            "descriptions": self.descriptions.tolist(),
+        })
+
+    def __len__(self):
+        return len(self.ndb)
+
+    @property
+    def search(self):
+        # Built on first use; shared with the store by every session
+        if self._search is None:
+            self._search = FoodSearch(self.foods)
+        return self._search
+
+    @property
+    def similarity(self):
+        # Standardized nutrient profiles, built on first use like search
+        if self._similarity is None:
+            self._similarity = FoodSimilarity(self)
+        return self._similarity
+
+    def row(self, food):
+        # Shrt_Desc string or NDB_No number -> row index
+        if isinstance(food, str):
+            return self.by_description[food]
+        return self.by_ndb[int(food)]
+
+    def rows(self, foods):
+        return np.fromiter((self.row(food) for food in foods), dtype=np.intp, count=len(foods))
+
+    def cols(self, columns):
+        return np.array([self.column_index[name] for name in columns], dtype=np.intp)
+
+    def value(self, food, column):
+        return self.matrix[self.row(food), self.column_index[column]]
+
+    def serving(self, food):
+        # -> ("1 artichoke (128 g)", 128.0)
+        row = self.row(food)
+        return self.serving_labels[row], float(self.serving_grams[row])
+
+
+def _stamp(path):
+    info = os.stat(path)
+    return [info.st_size, info.st_mtime_ns]
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_manifest(prefix):
+    try:
+        with open(f"{prefix}.json", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == CACHE_VERSION else None
+
+
+def _write_npy(target, array):
+    # Write-then-rename so a concurrent reader never maps a half-written file
+    temp = f"{target}.{os.getpid()}.tmp"
+    with open(temp, "wb") as f:
+        np.save(f, np.asarray(array))
+    os.replace(temp, target)
+
+
+def _write_json(target, data):
+    temp = f"{target}.{os.getpid()}.tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(temp, target)
+
+
+_stores = {}
+_lock = threading.Lock()
+
+
+def get_store(path=FOOD_TABLE):
+    # One store per process, shared by every session and rerun; reloaded if the CSV changes
+    path = os.path.abspath(path)
+    with _lock:
+        store = _stores.get(path)
+        if store is None or store.source_stamp != _stamp(path):
+            store = _stores[path] = NutrientStore.load(path)
+        return store
@@ -1,32 +1,26 @@
-import datetime
 import os
 import time
+import uuid
 import cv2
 import streamlit as st
 import mediapipe as mp
-import numpy as np
 from PIL import Image
-from playsound import playsound
-
-def calculate_angle(a, b, c):
-    radians = np.arctan2(c[1]-b[1], c[0]-b[0]) - np.arctan2(a[1]-b[1], a[0]-b[0])
-    angle = np.abs(radians * 180.0 / np.pi)
-    return angle   
-
-def count_time(time_interval):
-    global last_second, counter, pose_number
-    now = datetime.datetime.now()
-    current_second = int(now.strftime("%S"))
-    if current_second != last_second:
-        last_second = current_second
-        counter += 1
-        if counter == time_interval + 1:
-            counter = 0
-            pose_number += 1
-            playsound('../bell.wav')
-            if pose_number == 5:
-                pose_number = 1
-    return counter, pose_number
+from asana_library import get_recognizer
+from audio_cues import get_cue
+from camera_manager import CAMERAS
+from camera_sessions import SESSIONS, CameraSession
+from frame_pipeline import FramePipeline
+from frame_stream import STREAM_PUBLIC, STREAMS, stream_html
+from hold_timer import HoldTimer
+from hud_overlay import HudOverlay, draw_skeleton
+from pose_governor import PoseGovernor
+from pose_pool import POOL
+from pose_roi import RoiTracker
+from pose_smoothing import FrameSkipper
+from perf_metrics import PerfMetrics
+from pose_features import compute_features
+from session_log import SessionRecorder, new_session_path
+from yoga_tracks import ASANAS, TRACKS, RULES
 
 # Header Section
 st.markdown(
@@ -47,32 +41,42 @@ if not st.session_state['signedin']:
     st.warning("Please sign in to continue")
 
 else:
-    last_second = 0
-    counter = 0
-    pose_number = 1
-
     img1 = Image.open("./gif/yoga.gif")
 
-    img2 = Image.open("./images/pranamasana2.png")
-    img3 = Image.open("./images/Eka_Pada_Pranamasana.png")
-    img4 = Image.open("./images/Ashwa_Sanchalanasana.webp")
+    mp_pose = mp.solutions.pose
+    # Switches model complexity / input scale to keep the hold timers fed at a steady rate.
+    # Estimators are leased from the process-wide pool, so reruns do not rebuild the graph
+    pose = PoseGovernor(lambda complexity: POOL.acquire(complexity, 0.5, 0.5), release=POOL.release)
 
-    img5 = Image.open("./images/ardha_chakrasana.webp")
-    img6 = Image.open("./images/Utkatasana.png")
-    img7 = Image.open("./images/Veerabhadrasan_2.png")
+    # Per-stage timings for the sidebar performance panel and the /metrics endpoint
+    metrics = PerfMetrics()
 
-    mp_drawing = mp.solutions.drawing_utils
-    mp_pose = mp.solutions.pose
-    pose = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    # Crops to the previous frame's landmark box, full frame when tracking is lost
+    tracker = RoiTracker(metrics.timed("pose", pose.process), reset=pose.reset)
+
+    # Runs MediaPipe on every Nth frame only and smooths / predicts the landmarks
+    to_rgb = metrics.timed("color", lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    skipper = FrameSkipper(lambda frame: tracker.process(to_rgb(frame)))
+
+    def infer(frame):
+        # Runs on the pipeline's inference thread
+        return skipper.process(frame)
 
-    app_mode = st.sidebar.selectbox("Choose the exercise", ["About","Track 1","Track 2"])
+    app_mode = st.sidebar.selectbox("Choose the exercise", ["About", *TRACKS, "Free Flow"])
+    tracker.enabled = st.sidebar.checkbox("ROI tracking", value=True)
+    skipper.every_n = st.sidebar.slider("Run pose model every N frames", 1, 4, 2)
+    stream_video = st.sidebar.checkbox("Stream video (MJPEG)", value=STREAM_PUBLIC,
+                                       help="Off by default unless DADHICHI_STREAM_HOST or DADHICHI_STREAM_URL is set: the stream server only listens on this machine")
+    stream_fps = st.sidebar.slider("Stream FPS cap", 5, 30, 15)
+    stream_quality = st.sidebar.slider("JPEG quality", 30, 95, 70, 5)
+    record_session = st.sidebar.checkbox("Record session (landmarks only)", value=False)
 
     if app_mode == "About":
         if app_mode == "About":
             col1, col2 = st.columns(2)
         with col1:
             st.markdown(f"## Welcome to the Yoga arena, {st.session_state.name}")
-            st.markdown("Choose the Track you wish to do from the sidebar")
+            st.markdown("Choose the Track you wish to do from the sidebar, or Free Flow to practise asanas in any order")
             st.write("##")
             st.write("""
             Here are few general instructions to follow while doing the workout:
@@ -88,348 +92,203 @@ else:
         with col2:
             st.image(img1, width=400)
 
-    elif app_mode == "Track 1":
+    else:
+        # Free Flow has no fixed order: the asana being held is recognized from the library
+        track = TRACKS.get(app_mode)
 
-        st.markdown("## Welcome to Track1")
+        if track:
+            st.markdown(f"## Welcome to {app_mode.replace(' ', '')}")
+        else:
+            st.markdown("## Welcome to Free Flow")
+            st.write("Hold any of the asanas below in any order; the one you are doing is recognized automatically.")
 
         with st.container():
-            left_column1, right_column1 = st.columns(2)
-            with left_column1:
-                st.write("""
-                    Pranamasana (Prayer Pose):
-                    - Stand straight with feet together.
-                    - Bring palms together in front of chest.
-                    - Keep the spine erect and shoulders relaxed.
-                    - Focus on breathing deeply and evenly.
-                    - Hold for 5 seconds, breathe deeply.
-                """)
-                
-            with right_column1:
-                st.image(img2, width=200)
-
-            st.write("-------------")
-
-            left_column2, right_column2 = st.columns(2)
-            with left_column2:
-                st.write("""
-                    Eka Pada Pranamasana (One-Legged Prayer Pose):
-                    - Shift weight to left leg.
-                    - Bend right knee, place right foot on inner thigh.
-                    - Hold for 5 seconds.
-                    - Repeat on other side.
-                    
-                """)
-            with right_column2:
-                st.image(img3, width=200)
-
-            st.write("-------------")
-            
-            left_column3, right_column3 = st.columns(2)
-            with left_column3:
-                st.write("""
-                    Ashwa Sanchalanasana (Equestrian Pose):
-                    - Step right foot back into lunge.
-                    - Lower right knee, raise arms overhead.
-                    - Hold for 5 seconds.
-                    - Repeat on other side.
-                """)
-            with right_column3:
-                st.image(img4, width=200)
-            
-        
+            for k, name in enumerate(track or ASANAS):
+                asana = ASANAS[name]
+                if k:
+                    st.write("-------------")
+                left_column, right_column = st.columns(2)
+                with left_column:
+                    st.write(asana["instructions"])
+                with right_column:
+                    st.image(Image.open(asana["image"]), width=200)
+
         st.write("-------------")
 
         st.write("Click on the Start button to start the live video feed.")
         st.sidebar.header("Start Yoga")
         start = st.sidebar.button("Start Camera")
         stop = st.sidebar.button("Stop Camera")
-        cap = cv2.VideoCapture(0)
+        # One background camera session per browser session, reused across reruns
+        session_key = st.session_state.setdefault("stream_id", uuid.uuid4().hex)
+        if stop:
+            SESSIONS.stop(session_key)
+            CAMERAS.close(0)
         FRAME_WINDOW = st.empty()
-        
-        while start and not stop:
-            ret, frame = cap.read()
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = pose.process(image)
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-            image = cv2.resize(image,(800,600))
-
-            try:
-                landmarks = results.pose_landmarks.landmark
-                mp_drawing.draw_landmarks(image, results.pose_landmarks, mp_pose.POSE_CONNECTIONS,
-                                            mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                                            mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2, circle_radius=2))
-                
-                # if len(overlay_list) != 0:
-                left_shoulder = [landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                                landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-                right_shoulder = [landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                                landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-                left_wrist = [landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].x,
-                            landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].y]
-                right_wrist = [landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].x,
-                            landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].y]
-                left_hip = [landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                            landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].y]
-                right_hip = [landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                            landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-                left_elbow = [landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].x,
-                                landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].y]
-                right_elbow = [landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].x,
-                                landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].y]
-                left_knee = [landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value].x,
-                                landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value].y]
-                right_knee = [landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].x,
-                                landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].y]
-                left_ankle = [landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value].x,
-                                landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value].y]
-                right_ankle = [landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].x,
-                                landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].y]
-
-                
-                
-                # Check pose and display feedback
-                if pose_number == 1:
-                    #pranamasana
-                    left_angle = calculate_angle(left_wrist, left_shoulder, left_hip)
-                    right_angle = calculate_angle(right_wrist, right_shoulder, right_hip)
-                    distance = np.sqrt((right_wrist[0] - left_wrist[0])**2 + (right_wrist[1] - left_wrist[1])**2)
-                    if left_angle < 100 and right_angle < 100 and distance < 0.1:
-                        cv2.putText(image, "Pose: Correct", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                        counter, pose_number = count_time(5)    
-                        cv2.putText(image, f"TIME: {int(counter)}s", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                    else:
-                        cv2.putText(image, "Pose: Incorrect", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                        counter = 0
-
-                elif pose_number == 2:
-                    #ekapada pranamsana
-                    left_angle = calculate_angle(left_wrist, left_shoulder, left_hip)
-                    right_angle = calculate_angle(right_wrist, right_shoulder, right_hip)
-                    right_knee = calculate_angle(right_hip, right_knee, right_ankle)
-
-                        # Calculate distance between wrists
-                    distance = np.sqrt((right_wrist[0] - left_wrist[0])**2 + (right_wrist[1] - left_wrist[1])**2)
-
-                        # Check if wrists are close to the shoulders and (Pranamasana posture) and add timer
-                    if left_angle > 100 and right_angle > 100 and right_knee < 90 and distance < 0.1:
-                        cv2.putText(image, "asana: Correct", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                        counter, pose_number = count_time(5)
-                        cv2.putText(image, f"TIME: {int(counter)}s", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                    else:
-                        cv2.putText(image, "Pose: Incorrect", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                        counter = 0
+        session = None
 
-                # Ashwa Sanchalanasana        
-                elif pose_number == 3:
-                    left_angle = calculate_angle(left_shoulder,left_hip , left_knee)
-                    right_angle = calculate_angle(right_shoulder, right_hip, right_knee)
+        # Hold timer runs on the frames' monotonic timestamps; the bell plays on a
+        # background worker so the render thread never waits for it
+        bell = get_cue("bell.wav")
+        timer = HoldTimer([ASANAS[name]["hold"] for name in track or ()], on_advance=lambda index: bell.play())
+        if not track:
+            with st.spinner("Loading the asana library..."):
+                recognizer = get_recognizer()
+            flow_asana = None
 
-                    left_arm_angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
-                    right_arm_angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
+        # Verdict / timer text is only re-rasterized when it changes
+        hud = HudOverlay()
+        recorder = None
 
-                    left_shoulder_angle = calculate_angle(left_hip, left_shoulder, left_elbow)
-                    right_shoulder_angle = calculate_angle(right_hip, right_shoulder, right_elbow)
+        def render_track(frame, results):
+            image = cv2.resize(frame, (800, 600))
 
-                    left_leg_angle = calculate_angle(left_hip, left_knee, left_ankle)
-                    right_leg_angle = calculate_angle(right_hip, right_knee, right_ankle)
+            try:
+                if results.points is None:
+                    timer.update(False, results.timestamp)
+                    if recorder is not None:
+                        recorder.append(results.timestamp, state=timer.index)
+                    return image
+                with metrics.time("draw"):
+                    draw_skeleton(image, results.points, mp_pose.POSE_CONNECTIONS, (0, 255, 0), (255, 0, 0))
+
+                # Smoothed (or, on skipped frames, predicted) landmarks; every asana
+                # in the library is checked in one vectorized pass
+                with metrics.time("rules"):
+                    features = compute_features(results.points)
+                    verdicts = RULES.evaluate(features)
+                if recorder is not None:
+                    recorder.append(results.timestamp, results.points, features, verdicts, timer.index)
 
-                    if left_leg_angle > 90 and right_leg_angle < 150 :
-                        cv2.putText(image, "asana: Correct", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                        counter, pose_number = count_time(5)
-                        cv2.putText(image, f"TIME: {int(counter)}s", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+                # Check pose and display feedback
+                if not timer.done:
+                    name = track[timer.index]
+                    label = ASANAS[name]["label"]
+                    if verdicts[RULES.index[name]]:
+                        hud.text("verdict", f"{label}: Correct", (50, 50), 1, (0, 255, 0))
+                        timer.update(True, results.timestamp)
+                        hud.text("time", f"TIME: {int(timer.held)}s", (50, 100), 1, (255, 255, 255))
                     else:
-                        cv2.putText(image, "asana: Incorrect", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                        counter = 0
+                        hud.text("verdict", f"{label}: Incorrect", (50, 50), 1, (0, 0, 255))
+                        hud.hide("time")
+                        timer.update(False, results.timestamp)
                 else:
                     #pause the frame
-                    cv2.putText(image, "Track completed", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                    st.write("Task Completed")
-                    start = False
+                    hud.text("verdict", "Track completed", (50, 50), 1, (0, 0, 255))
+                    hud.hide("time")
+                    session.finish()
+                with metrics.time("hud"):
+                    hud.apply(image)
 
             except:
-                pass     
-
-            # Display the image
-            # FRAME_WINDOW.image(image, channels="BGR")
-            FRAME_WINDOW.image(image, channels="BGR", use_container_width=True)
-            
-        cap.release()
-
-        
+                pass
+            return image
 
-    elif app_mode == "Track 2":
-        
-        st.markdown("## Welcome to Track2")
-
-        with st.container():
-            left_column1, right_column1 = st.columns(2)
-            with left_column1:
-                st.write("""
-                    Ardha Chakrasana (Half Wheel Pose):
-                    - Stand with feet hip-width apart.
-                    - Inhale, raise arms overhead, palms together.
-                    - Exhale, bend backwards, keeping arms straight.
-                    - Hold for 5 seconds.
-                """)
-                
-            with right_column1:
-                st.image(img5, width=200)
-
-            st.write("-------------")
-
-            left_column2, right_column2 = st.columns(2)
-            with left_column2:
-                st.write("""
-                    Utkatasana (Chair Pose):
-                    - Stand with feet together.
-                    - Inhale, raise arms overhead.
-                    - Exhale, bend knees and lower hips as if sitting on a chair.
-                    - Hold for 5 seconds.
-                    
-                """)
-            with right_column2:
-                st.image(img6, width=200)
-
-            st.write("-------------")
-            
-            left_column3, right_column3 = st.columns(2)
-            with left_column3:
-                st.write("""
-                    Veerabhadrasana 2 (Warrior 2 Pose):
-                    - Step left foot back, right foot forward.
-                    - Bend right knee, aligning it with ankle.
-                    - Extend arms parallel to ground, palms facing down.
-                    - Hold for 5 seconds.
-                """)
-            with right_column3:
-                st.image(img7, width=200)
-            
-        
-        st.write("-------------")
-
-        st.write("Click on the Start button to start the live video feed.")
-
-        st.sidebar.header("Start Yoga")
-        start = st.sidebar.button("Start Camera")
-        stop = st.sidebar.button("Stop Camera")
-        cap = cv2.VideoCapture(0)
-        FRAME_WINDOW = st.empty()
-        
-        while start and not stop:
-            ret, frame = cap.read()
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = pose.process(image)
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-            image = cv2.resize(image,(800,600))
+        def render_flow(frame, results):
+            global flow_asana
+            image = cv2.resize(frame, (800, 600))
 
             try:
-                landmarks = results.pose_landmarks.landmark
-                mp_drawing.draw_landmarks(image, results.pose_landmarks, mp_pose.POSE_CONNECTIONS,
-                                            mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                                            mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2, circle_radius=2))
-                
-                # if len(overlay_list) != 0:
-                left_shoulder = [landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                                landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-                right_shoulder = [landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                                landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-                left_wrist = [landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].x,
-                            landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].y]
-                right_wrist = [landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].x,
-                            landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].y]
-                left_hip = [landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                            landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].y]
-                right_hip = [landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                            landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-                left_elbow = [landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].x,
-                                landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].y]
-                right_elbow = [landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].x,
-                                landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].y]
-                left_knee = [landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value].x,
-                                landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value].y]
-                right_knee = [landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].x,
-                                landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].y]
-                left_ankle = [landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value].x,
-                                landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value].y]
-                right_ankle = [landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].x,
-                                landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].y]
-
-                
-                
-                # Check pose and display feedback
-                if pose_number == 1:
-                    #ardha chakrasana
-                    left_angle = calculate_angle(left_wrist, left_shoulder, left_hip)
-                    right_angle = calculate_angle(right_wrist, right_shoulder, right_hip)
-                    right_knee = calculate_angle(right_hip, right_knee, right_ankle)
-                    distance = np.sqrt((right_wrist[0] - left_wrist[0])**2 + (right_wrist[1] - left_wrist[1])**2)
-
-                    if left_angle > 100 and right_angle > 100 and  distance < 0.1:
-                        cv2.putText(image, "Pose: Correct", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                        counter, pose_number = count_time(5)
-                        cv2.putText(image, f"TIME: {int(counter)}s", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                    else:
-                        cv2.putText(image, "Pose: Incorrect", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                        counter = 0
-
-                elif pose_number == 2:
-                    #utkatasana
-                    left_angle = calculate_angle(left_shoulder,left_hip , left_knee)
-                    right_angle = calculate_angle(right_shoulder, right_hip, right_knee)
-
-                    left_arm_angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
-                    right_arm_angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
-
-                    left_shoulder_angle = calculate_angle(left_hip, left_shoulder, left_elbow)
-                    right_shoulder_angle = calculate_angle(right_hip, right_shoulder, right_elbow)
-
-                    left_leg_angle = calculate_angle(left_hip, left_knee, left_ankle)
-                    right_leg_angle = calculate_angle(right_hip, right_knee, right_ankle)
-
-                        # Calculate distance between wrists
-                    distance = np.sqrt((right_wrist[0] - left_wrist[0])**2 + (right_wrist[1] - left_wrist[1])**2)
-
-                        # Check if wrists are close to the shoulders and (Pranamasana posture) and add timer
-                    if right_leg_angle < 150 and left_leg_angle < 150 and left_arm_angle > 150 and right_arm_angle > 150 and left_shoulder_angle > 120  and right_shoulder_angle > 120 :
-                        cv2.putText(image, "asana: Correct", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                        counter, pose_number = count_time(5)
-                        cv2.putText(image, f"TIME: {int(counter)}s", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                    else:
-                        cv2.putText(image, "Pose: Incorrect", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                        counter = 0
-                        
-                # Veerabadrasana 2
-                elif pose_number == 3:
-                    left_angle = calculate_angle(left_shoulder,left_hip , left_knee)
-                    right_angle = calculate_angle(right_shoulder, right_hip, right_knee)
-
-                    left_arm_angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
-                    right_arm_angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
-
-                    left_shoulder_angle = calculate_angle(left_hip, left_shoulder, left_elbow)
-                    right_shoulder_angle = calculate_angle(right_hip, right_shoulder, right_elbow)
-
-                    left_leg_angle = calculate_angle(left_hip, left_knee, left_ankle)
-                    right_leg_angle = calculate_angle(right_hip, right_knee, right_ankle)
-
-                    if right_leg_angle < 120  and left_arm_angle > 150 and right_arm_angle > 150 and left_shoulder_angle < 120  and right_shoulder_angle < 120 :
-                        cv2.putText(image, "asana: Correct", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                        counter, pose_number = count_time(5)
-                        cv2.putText(image, f"TIME: {int(counter)}s", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                    else:
-                        cv2.putText(image, "asana: Incorrect", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                        counter = 0
+                if results.points is None:
+                    timer.update(False, results.timestamp)
+                    if recorder is not None:
+                        recorder.append(results.timestamp, state=-1)
+                    return image
+                with metrics.time("draw"):
+                    draw_skeleton(image, results.points, mp_pose.POSE_CONNECTIONS, (0, 255, 0), (255, 0, 0))
+
+                # One vectorized nearest-neighbour lookup against every reference pose
+                with metrics.time("rules"):
+                    features = compute_features(results.points)
+                    name, confidence = recognizer.classify(features)
+                if recorder is not None:
+                    recorder.append(results.timestamp, results.points, features, RULES.evaluate(features),
+                                    RULES.index.get(name, -1))
+
+                if name is None or confidence < 0.4:
+                    hud.text("verdict", "No asana recognized", (50, 50), 1, (0, 0, 255))
+                    hud.hide("time")
+                    timer.update(False, results.timestamp)
                 else:
-                    #pause the frame
-                    cv2.putText(image, "Track completed", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                    start = False
+                    if name != flow_asana:
+                        # A new asana starts its own hold
+                        flow_asana = name
+                        timer.holds = [ASANAS[name]["hold"]]
+                        timer.reset()
+                    label = ASANAS[name]["label"]
+                    timer.update(True, results.timestamp)
+                    if timer.done:
+                        hud.text("verdict", f"{label}: Held", (50, 50), 1, (0, 255, 0))
+                        hud.hide("time")
+                    else:
+                        hud.text("verdict", f"{label} ({confidence:.0%})", (50, 50), 1, (0, 255, 0))
+                        hud.text("time", f"TIME: {int(timer.held)}s", (50, 100), 1, (255, 255, 255))
+                with metrics.time("hud"):
+                    hud.apply(image)
 
             except:
-                pass     
-
-            # Display the image
-            FRAME_WINDOW.image(image, channels="BGR")
-            # FRAME_WINDOW.image(image, channels="BGR", use_container_width=True)
-            
-        cap.release()
-    
+                pass
+            return image
+
+        camera = None
+        if start and not stop:
+            # A restart replaces this browser session's previous camera session
+            SESSIONS.stop(session_key)
+            try:
+                # Opened only now, as MJPG 640x480@30, and shared across reruns
+                camera = CAMERAS.acquire(0, 640, 480, 30)
+            except IOError as e:
+                st.error(f"Cannot open the camera: {e}")
+        if camera is not None:
+            # The stream and the recording only start once there is a camera to feed them
+            channel = None
+            if stream_video:
+                try:
+                    channel = STREAMS.channel(session_key, stream_fps, stream_quality)
+                except OSError as e:
+                    # Port taken, e.g. by a second instance: show the frames through st.image instead
+                    st.warning(f"Video streaming is unavailable ({e}), showing the frames directly instead")
+            if record_session:
+                recorder = SessionRecorder(new_session_path(st.session_state.get("username"), "yoga"),
+                                           RULES.names, meta={"track": app_mode} if track else {"mode": "free_flow"})
+                st.sidebar.caption(f"Recording to {recorder.path}")
+            pipeline = FramePipeline(camera.read, infer, render_track if track else render_flow)
+            cleanup = [pose.close, lambda: STREAMS.close(session_key),
+                       lambda: CAMERAS.release(camera, linger=0 if session.done else 2.0)]
+            if recorder is not None:
+                cleanup.append(recorder.close)
+            session = CameraSession(pipeline, channel, cleanup=cleanup, metrics=metrics, labels={"page": "yoga"},
+                                    status=lambda: f"{pipeline.summary()} | {pose.label()} | "
+                                                   f"ROI: {'on' if tracker.tracking else 'full frame'}")
+            SESSIONS.start(session_key, session)
+
+        # The script only polls the background session; it never blocks on the camera
+        active = SESSIONS.get(session_key)
+        if active is not None and not active.running:
+            SESSIONS.pop(session_key)
+            if active.done:
+                st.write("Task Completed")
+        elif active is not None:
+            headers = st.context.headers
+            if active.channel is not None:
+                FRAME_WINDOW.markdown(stream_html(STREAMS.url(session_key, headers)), unsafe_allow_html=True)
+
+            @st.fragment(run_every=1.0 if active.channel is not None else 1.0 / stream_fps)
+            def show_session():
+                active.touch()
+                if not active.running:
+                    st.rerun()
+                if active.channel is None and active.frame is not None:
+                    with active.metrics.time("display"):
+                        st.image(active.frame, channels="BGR", use_container_width=True)
+                st.caption(active.status)
+
+            @st.fragment(run_every=1.0)
+            def show_performance():
+                with st.expander("Performance"):
+                    st.table(active.metrics.rows())
+                    st.caption(f"Prometheus metrics: {STREAMS.metrics_url(headers)}")
+
+            show_session()
+            with st.sidebar:
+                show_performance()
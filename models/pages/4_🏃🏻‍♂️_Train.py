@@ -3,14 +3,27 @@ import mediapipe as mp
 import numpy as np
 import cv2
 import logging
+import uuid
 from PIL import Image
+from camera_manager import CAMERAS
+from camera_sessions import SESSIONS, CameraSession
+from frame_pipeline import FramePipeline
+from frame_stream import STREAM_PUBLIC, STREAMS, stream_html
+from hud_overlay import HudOverlay, draw_skeleton
+from pose_governor import PoseGovernor
+from pose_pool import POOL
+from pose_roi import RoiTracker
+from pose_smoothing import FrameSkipper
+from perf_metrics import PerfMetrics
+from pose_features import compute_features
+from rep_counter import RepCounter, joint_landmark
+from session_log import SessionRecorder, new_session_path
 
 # Set up logging to capture errors in the terminal instead of showing them in Streamlit UI
 logging.basicConfig(level=logging.ERROR)
 
-# Initialize Mediapipe Pose and Drawing utilities
+# Initialize Mediapipe Pose
 mp_pose = mp.solutions.pose
-mp_drawing = mp.solutions.drawing_utils
 
 # Header Section
 st.markdown(
@@ -41,122 +54,151 @@ if st.session_state['signedin']:
     # Dropdown Menu for Exercise Selection
     exercise = st.selectbox("Select an Exercise", ["-- Select --", "Bicep Curl", "Squat", "Push-up"])
 
-    # Initialize session state variables for camera control
-    if "run_camera" not in st.session_state:
-        st.session_state.run_camera = False
-
-    # Only show camera controls if Bicep Curl is selected
-    if exercise == "Bicep Curl":
+    # Camera controls once an exercise is selected
+    if exercise != "-- Select --":
         st.sidebar.header("Configuration")
         confidence_threshold = st.sidebar.slider("Detection Confidence", 0.1, 1.0, 0.5, 0.1)
         tracking_threshold = st.sidebar.slider("Tracking Confidence", 0.1, 1.0, 0.5, 0.1)
+        roi_tracking = st.sidebar.checkbox("ROI tracking", value=True,
+                                           help="Crop to the previous frame's landmarks; landmarks below the tracking confidence do not count towards the crop")
+        target_fps = st.sidebar.slider("Target FPS", 5, 30, 15, 1)
+        inference_every = st.sidebar.slider("Run pose model every N frames", 1, 4, 2)
+        stream_video = st.sidebar.checkbox("Stream video (MJPEG)", value=STREAM_PUBLIC,
+                                           help="Off by default unless DADHICHI_STREAM_HOST or DADHICHI_STREAM_URL is set: the stream server only listens on this machine")
+        stream_fps = st.sidebar.slider("Stream FPS cap", 5, 30, 15)
+        stream_quality = st.sidebar.slider("JPEG quality", 30, 95, 70, 5)
+        record_session = st.sidebar.checkbox("Record session (landmarks only)", value=False)
 
         # Start & Stop Buttons
         start_button = st.sidebar.button("Start Camera")
         stop_button = st.sidebar.button("Stop Camera")
 
-        # Handle button clicks
-        if start_button:
-            st.session_state.run_camera = True
+        # The camera loop runs in a background session owned by this browser session,
+        # so Stop takes effect right away instead of waiting for a script loop
+        session_key = st.session_state.setdefault("stream_id", uuid.uuid4().hex)
         if stop_button:
-            st.session_state.run_camera = False
+            SESSIONS.stop(session_key)
+            CAMERAS.close(0)
+            st.write("📷 Camera Stopped.")
 
-        # Function to calculate angle between three points
-        def calculate_angle(a, b, c):
+        camera = None
+        if start_button:
+            # A restart replaces this browser session's previous camera session
+            SESSIONS.stop(session_key)
             try:
-                a = np.array(a)
-                b = np.array(b)
-                c = np.array(c)
-                radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - np.arctan2(a[1] - b[1], a[0] - b[0])
-                angle = np.abs(radians * 180.0 / np.pi)
-                if angle > 180.0:
-                    angle = 360 - angle
-                return angle
-            except Exception as e:
-                logging.error(f"Angle Calculation Error: {e}")
-                return 0  # Default to 0 if error occurs
-
-        # Camera Feed
-        if st.session_state.run_camera:
-            st.write("📹 Camera is ON. Get Ready to Perform Bicep Curls!")
-            cap = cv2.VideoCapture(0)  # Capture from webcam
-            stframe = st.empty()  # Streamlit placeholder for video frames
-
-            counter = 0  # Rep counter
-            stage = None  # "up" or "down"
-
-            # Setup Mediapipe Pose
-            with mp_pose.Pose(
-                min_detection_confidence=confidence_threshold, 
-                min_tracking_confidence=tracking_threshold
-            ) as pose:
-                while st.session_state.run_camera and cap.isOpened():
-                    ret, frame = cap.read()
-                    if not ret:
-                        logging.error("Unable to read from camera. Please check your webcam.")
-                        break
-
-                    try:
-                        # Convert to RGB
-                        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        image.flags.writeable = False
-                        results = pose.process(image)
-
-                        # Convert back to BGR
-                        image.flags.writeable = True
-                        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-
-                        if results.pose_landmarks:
-                            landmarks = results.pose_landmarks.landmark
-
-                            # Extract shoulder, elbow, and wrist landmarks
-                            shoulder = [landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                                        landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-                            elbow = [landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].x,
-                                    landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].y]
-                            wrist = [landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].x,
-                                    landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].y]
-
-                            # Calculate angle
-                            angle = calculate_angle(shoulder, elbow, wrist)
-
-                            # Display angle
-                            cv2.putText(image, str(angle),
-                                        tuple(np.multiply(elbow, [640, 480]).astype(int)),
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2, cv2.LINE_AA)
-
-                            # Rep counting logic
-                            if angle > 150:
-                                stage = "down"
-                            if angle < 40 and stage == 'down':
-                                stage = "up"
-                                counter += 1
-
-                        # Display Rep Counter
-                        cv2.rectangle(image, (0, 0), (225, 73), (245, 117, 16), -1)
-                        cv2.putText(image, 'REPS', (15, 12), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1, cv2.LINE_AA)
-                        cv2.putText(image, str(counter), 
-                                    (10, 60), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 2, cv2.LINE_AA)
-                        cv2.putText(image, 'STAGE', (65, 12), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1, cv2.LINE_AA)
-                        cv2.putText(image, stage if stage else "None", 
-                                    (60, 60), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 2, cv2.LINE_AA)
-
-                        # Draw Pose Landmarks
-                        if results.pose_landmarks:
-                            mp_drawing.draw_landmarks(image, results.pose_landmarks, mp_pose.POSE_CONNECTIONS,
-                                                    mp_drawing.DrawingSpec(color=(245, 117, 66), thickness=2, circle_radius=2), 
-                                                    mp_drawing.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2))
-
-                        # Show Image in Streamlit
-                        stframe.image(image, channels="BGR", use_container_width=True)
-
-                    except Exception as e:
-                        logging.error(f"Error in Camera Processing: {e}")
-                        continue  # Skip this frame if an error occurs
-
-                cap.release()
-                st.write("📷 Camera Stopped.")
+                camera = CAMERAS.acquire(0, 640, 480, 30)  # Shared webcam handle, MJPG 640x480@30
+            except IOError as e:
+                st.error(f"Cannot open the camera: {e}")
+        if camera is not None:
+            # Both sides of every exercise are tracked from the same feature vector;
+            # the HUD shows the selected one
+            reps = RepCounter()
+            joint = joint_landmark(exercise)
+
+            # Rep counter panel: static parts are rasterized once, values only when they change
+            hud = HudOverlay()
+            hud.panel(((0, 0), (225, 73)), (245, 117, 16))
+            hud.text("reps_label", 'REPS', (15, 12), 0.5, (0, 0, 0), 1, cv2.LINE_AA)
+            hud.text("stage_label", 'STAGE', (65, 12), 0.5, (0, 0, 0), 1, cv2.LINE_AA)
+
+            # Lease pooled Mediapipe Pose estimators; the governor trades model complexity and
+            # input resolution for frame rate on slower machines
+            pose = PoseGovernor(lambda complexity: POOL.acquire(complexity, confidence_threshold, tracking_threshold),
+                                target_fps=target_fps, release=POOL.release)
+            # Per-stage timings for the sidebar performance panel and the /metrics endpoint
+            metrics = PerfMetrics()
+            tracker = RoiTracker(metrics.timed("pose", pose.process), min_visibility=tracking_threshold,
+                                 enabled=roi_tracking, reset=pose.reset)
+            to_rgb = metrics.timed("color", lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            skipper = FrameSkipper(lambda frame: tracker.process(to_rgb(frame)), every_n=inference_every)
+            # Frames go to the browser as an MJPEG stream encoded off the script thread
+            channel = None
+            if stream_video:
+                try:
+                    channel = STREAMS.channel(session_key, stream_fps, stream_quality)
+                except OSError as e:
+                    # Port taken, e.g. by a second instance: show the frames through st.image instead
+                    st.warning(f"Video streaming is unavailable ({e}), showing the frames directly instead")
+            # Compact landmark log that can be replayed through the same render function
+            recorder = SessionRecorder(new_session_path(st.session_state.get("username"), "train"),
+                                       meta={"exercise": exercise}) if record_session else None
+
+            def infer(frame):
+                # Runs on the pipeline's inference thread; smoothed landmarks every frame,
+                # MediaPipe only every `inference_every` frames
+                return skipper.process(frame)
+
+            def render(image, results):
+                # Runs on the pipeline's render thread; draws onto the captured BGR frame
+                features = None
+                if results.points is not None:
+                    points = results.points
+                    with metrics.time("rules"):
+                        features = compute_features(points)
+                        reps.update(features, results.timestamp)
+
+                    # Display the left-side angle the selected exercise follows
+                    angle = features[reps.columns[reps.tracks.index((exercise, "left"))]]
+                    cv2.putText(image, str(int(angle)),
+                                tuple(np.multiply(points[joint, :2], [640, 480]).astype(int)),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2, cv2.LINE_AA)
+
+                counter, stage, last = reps.summary(exercise)
+                if recorder is not None:
+                    recorder.append(results.timestamp, results.points, features, state=counter)
+
+                # Display Rep Counter
+                hud.text("reps", str(counter), (10, 60), 2, (255, 255, 255), 2, cv2.LINE_AA)
+                hud.text("stage", stage if stage else "None", (60, 60), 2, (255, 255, 255), 2, cv2.LINE_AA)
+                if last is not None:
+                    hud.text("last_rep", f"Last rep: {last.duration:.1f}s ({last.closing:.1f}s / {last.opening:.1f}s), "
+                             f"ROM {int(last.rom)} deg", (10, 95), 0.5, (255, 255, 255), 1, cv2.LINE_AA)
+                with metrics.time("hud"):
+                    hud.apply(image)
+
+                # Draw Pose Landmarks
+                if results.points is not None:
+                    with metrics.time("draw"):
+                        draw_skeleton(image, results.points, mp_pose.POSE_CONNECTIONS, (245, 117, 66), (245, 66, 230))
+                return image
+
+            # Capture, inference and rendering run on their own threads
+            pipeline = FramePipeline(camera.read, infer, render)
+            cleanup = [pose.close, lambda: STREAMS.close(session_key), lambda: CAMERAS.release(camera)]
+            if recorder is not None:
+                cleanup.append(recorder.close)
+                st.sidebar.caption(f"Recording to {recorder.path}")
+            SESSIONS.start(session_key, CameraSession(
+                pipeline, channel, cleanup=cleanup, metrics=metrics, labels={"page": "train", "exercise": exercise},
+                status=lambda: f"{pipeline.summary()} | {pose.label()} | ROI: {'on' if tracker.tracking else 'full frame'}"))
+
+        # Camera Feed: the script only polls the background session
+        active = SESSIONS.get(session_key)
+        if active is not None and active.running:
+            st.write(f"📹 Camera is ON. Get Ready to Perform {exercise}s!")
+            headers = st.context.headers
+            if active.channel is not None:
+                st.markdown(stream_html(STREAMS.url(session_key, headers)), unsafe_allow_html=True)
+
+            @st.fragment(run_every=1.0 if active.channel is not None else 1.0 / stream_fps)
+            def show_session():
+                active.touch()
+                if not active.running:
+                    st.rerun()
+                if active.channel is None and active.frame is not None:
+                    with active.metrics.time("display"):
+                        st.image(active.frame, channels="BGR", use_container_width=True)
+                st.caption(active.status)
+
+            @st.fragment(run_every=1.0)
+            def show_performance():
+                with st.expander("Performance"):
+                    st.table(active.metrics.rows())
+                    st.caption(f"Prometheus metrics: {STREAMS.metrics_url(headers)}")
+
+            show_session()
+            with st.sidebar:
+                show_performance()
+        elif active is not None:
+            SESSIONS.pop(session_key)
+            st.write("📷 Camera Stopped.")
@@ -1,10 +1,12 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 # from pydataset import data
 from streamlit_extras.no_default_selectbox import selectbox
 import matplotlib.pyplot as plt
+from meal_log import dish_totals
+from meal_solver import solve_meal
+from nutrient_store import MEAL_NUTRIENTS, get_store
 
 st.set_page_config(page_title='Nutrition Calorie Tracker', layout='wide')
 
@@ -17,57 +19,95 @@ st.markdown(html, unsafe_allow_html=True)
 st.write("")
 
 # st.title('Nutrition Calorie Tracker')
-df=pd.read_csv("./food1.csv", encoding='mac_roman')
+# Indexed once per process; every lookup below is a dict hit plus a row gather
+store = get_store("./food1.csv")
+
+mode=st.radio('Mode',['Track my meal','Plan to macro targets','Find similar foods'],horizontal=True)
+if mode=='Find similar foods':
+    # Nearest nutrient profiles to the chosen food, for swaps
+    query=st.text_input('Search for a food ',key="like_search",placeholder="e.g. cheddar, brocoli raw")
+    options=store.search.top(query,k=25) if query else []
+    sel=selectbox('Select the food ',options,no_selection_label=" ",key="like_food")
+    col1,col2,col3=st.columns(3)
+    k=col1.slider('Number of foods',1,25,10)
+    same_kind=col2.checkbox(f"Only {store.similarity.category(sel)}" if sel else 'Only the same kind of food')
+    max_kcal=col3.number_input('Max calories per serving (0 = any)',min_value=0,max_value=2000,value=0,step=25)
+    if sel:
+        similar=store.similarity.similar(sel,k,category=store.similarity.category(sel) if same_kind else None,
+                                         max_kcal=max_kcal or None)
+        foods=[food for food,_ in similar]
+        if not foods:
+            st.warning('No food matches these limits.')
+        else:
+            per_dish,_=dish_totals(store,foods,np.ones(len(foods)),MEAL_NUTRIENTS[:4])
+            st.table([{'Food':food,'Serving':store.serving(food)[0],'Calories':round(values[0]),
+                       'Protein (g)':round(values[1],1),'Carbs (g)':round(values[2],1),'Fat (g)':round(values[3],1),
+                       'Difference':round(distance,2)} for (food,distance),values in zip(similar,per_dish)])
+    st.stop()
+if mode=='Plan to macro targets':
+    # Searches the whole nutrient table for servings that hit the targets
+    col1,col2,col3,col4=st.columns(4)
+    targets={
+        'calories':col1.number_input('Calories (kcal)',min_value=100,max_value=5000,value=2000,step=50),
+        'protein':col2.number_input('Protein (g)',min_value=0,max_value=400,value=120,step=5),
+        'carbs':col3.number_input('Carbs (g)',min_value=0,max_value=800,value=220,step=5),
+        'fat':col4.number_input('Fat (g)',min_value=0,max_value=300,value=70,step=5),
+    }
+    col1,col2,col3=st.columns(3)
+    if col1.checkbox('Sugar target'):
+        targets['sugar']=col1.number_input('Sugar (g)',min_value=1,max_value=300,value=40,step=5)
+    if col2.checkbox('Calcium target'):
+        targets['calcium']=col2.number_input('Calcium (mg)',min_value=1,max_value=3000,value=1000,step=50)
+    max_foods=col3.slider('Maximum number of foods',1,10,5)
+    foods_query=st.text_input('Only use foods matching (optional, separate searches with ";")',placeholder='chicken breast; rice; broccoli raw')
+    all_foods=st.checkbox('Search all USDA foods, not only everyday ones')
+
+    if st.button('Propose a meal'):
+        candidates=store.foods if all_foods else None
+        if foods_query.strip():
+            candidates=set()
+            for query in foods_query.split(';'):
+                candidates.update(store.search.top(query,k=50))
+        plan,totals=solve_meal(store,targets,max_foods=max_foods,candidates=candidates)
+        if not plan:
+            st.warning('No combination of the matching foods gets closer to the targets.')
+        else:
+            # The solver's amounts are multiples of the 100 g rows; shown as grams and servings
+            st.table([{'Food':food,'Amount (g)':round(amount*100),'Servings':round(amount*100/store.serving(food)[1],1),
+                       'Serving':store.serving(food)[0]} for food,amount in plan])
+            st.table([{'Nutrient':name,'Target':targets[name],'Plan':round(total,1)} for name,total in totals.items()])
+    st.stop()
 ye=st.number_input('Enter Number of dishes', min_value=1, max_value=10)
-i=0
-j=0
-calories=0
 list1=[]
-list2=[]
-list3=[]
-list4=[]
-list5=[]
-list6=[]
-list7=[]
-list8=[]
+servings=[]
 
 
 try:
-    while(i<ye):
+    for i in range(ye):
         st.write("--------------------")
-        sel=selectbox('Select the food ',df['Shrt_Desc'].unique(),no_selection_label=" ",key=i)
-        list1.append(sel)
-        sel_serving=st.number_input('Select the number of servings ',min_value=1,max_value=10,value=1,step=1,key=j+100)
-        # list2.append(sel_serving)
-        i=i+1
-        j=j+1
+        # Only the best matches for what was typed are sent to the browser, not all 8.8k foods
+        query=st.text_input('Search for a food ',key=f"search_{i}",placeholder="e.g. cheddar, brocoli raw")
+        options=store.search.top(query,k=25) if query else []
+        previous=st.session_state.get(i)
+        if previous in store.by_description and previous not in options:
+            options.insert(0,previous)
+        sel=selectbox('Select the food ',options,no_selection_label=" ",key=i)
+        sel_serving=st.number_input('Select the number of servings ',min_value=1,max_value=10,value=1,step=1,key=i+100)
         st.write("Food : ",sel)
-        st.write("Serving : ",sel_serving)
-        st.write("Calories per serving : ",df[df['Shrt_Desc']==sel]['Energ_Kcal'].values[0])
-        cal= df[df['Shrt_Desc']==sel]['Energ_Kcal'].values[0]*sel_serving
-        list2.append(cal)
-        st.write("Total calories for ",sel_serving,"servings of ",sel ,"= ",cal,"Energ_Kcal")
-        
-        #protine
+        # A serving is the food's household portion, the table values are per 100 g
+        serving_label, serving_grams = store.serving(sel)
+        st.write("Serving : ",sel_serving," x ",serving_label)
+        kcal = round(store.value(sel, 'Energ_Kcal')*serving_grams/100)
+        st.write("Calories per serving : ",kcal)
+        st.write("Total calories for ",sel_serving,"servings of ",sel ,"= ",kcal*sel_serving,"Energ_Kcal")
+        list1.append(sel)
+        servings.append(sel_serving)
+
+    # Calories, protein, carbs, fat, sugar and calcium of every dish in one gather-and-multiply
+    per_dish, totals = dish_totals(store, list1, servings, MEAL_NUTRIENTS)
+    list2, list3, list4, list5, list7, list8 = per_dish.T
+    calories = totals[0]
 
-        protine= df[df['Shrt_Desc']==sel]['Protein_(g)'].values[0]*sel_serving
-        list3.append(protine)
-        
-        carbs= df[df['Shrt_Desc']==sel]['Carbohydrt_(g)'].values[0]*sel_serving
-        list4.append(carbs)
-        
-        fat= df[df['Shrt_Desc']==sel]['Lipid_Tot_(g)'].values[0]*sel_serving
-        list5.append(fat)
-        
-        sugar= df[df['Shrt_Desc']==sel]['Sugar_Tot_(g)'].values[0]*sel_serving
-        list7.append(sugar)
-        
-        calcium= df[df['Shrt_Desc']==sel]['Calcium_(mg)'].values[0]*sel_serving
-        list8.append(calcium)
-        
-        calories += cal
-   
-    
     st.write("Total Calories:", calories)
     st.write("--------------------")
     
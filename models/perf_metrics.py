@@ -0,0 +1,104 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from frame_pipeline import StageStats
+
+# Per-stage latency metrics for the pose pages. Each camera session keeps a
+# PerfMetrics with rolling FPS / mean ms per named stage (capture, color conversion,
+# pose.process, rules, drawing, display...). The pages show them in a sidebar panel
+# and METRICS exposes every live session in Prometheus text format on the stream
+# server's /metrics path, so "the counter is laggy" can be traced to a stage.
+
+
+class PerfMetrics:
+
+    def __init__(self, window=60):
+        self.window = window
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats(self.window)
+            return stats
+
+    def adopt(self, stages):
+        # Share StageStats that something else already records, e.g. FramePipeline.stats
+        with self._lock:
+            self.stages.update(stages)
+
+    def record(self, name, started, finished=None):
+        self.stage(name).record(started, time.perf_counter() if finished is None else finished)
+
+    @contextmanager
+    def time(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started)
+
+    def timed(self, name, function):
+        # Wrap a callable so every call is recorded under `name`
+        stats = self.stage(name)
+
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stats.record(started, time.perf_counter())
+        return wrapper
+
+    def rows(self):
+        with self._lock:
+            stages = list(self.stages.items())
+        return [{"stage": name, "fps": round(stats.fps, 1), "ms": round(stats.ms, 2), "frames": stats.count}
+                for name, stats in stages]
+
+
+class MetricsRegistry:
+    # Live sessions' metrics, labelled for the Prometheus endpoint
+
+    def __init__(self):
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def register(self, key, metrics, **labels):
+        with self._lock:
+            self._sources[key] = (metrics, labels)
+
+    def unregister(self, key, metrics=None):
+        # With metrics given, only if the key still belongs to them (a restart may have replaced it)
+        with self._lock:
+            if metrics is None or self._sources.get(key, (None,))[0] is metrics:
+                self._sources.pop(key, None)
+
+    def prometheus(self):
+        with self._lock:
+            sources = list(self._sources.values())
+        lines = [
+            "# HELP dadhichi_sessions Live camera sessions",
+            "# TYPE dadhichi_sessions gauge",
+            f"dadhichi_sessions {len(sources)}",
+        ]
+        series = {
+            "stage_ms": ("gauge", "Rolling mean time per stage in milliseconds"),
+            "stage_fps": ("gauge", "Rolling rate per stage in frames per second"),
+            "stage_frames_total": ("counter", "Frames processed per stage"),
+        }
+        for metric, (kind, help_text) in series.items():
+            lines.append(f"# HELP dadhichi_{metric} {help_text}")
+            lines.append(f"# TYPE dadhichi_{metric} {kind}")
+            for metrics, labels in sources:
+                for row in metrics.rows():
+                    value = {"stage_ms": row["ms"], "stage_fps": row["fps"], "stage_frames_total": row["frames"]}[metric]
+                    tags = ",".join(f'{k}="{v}"' for k, v in {**labels, "stage": row["stage"]}.items())
+                    lines.append(f"dadhichi_{metric}{{{tags}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
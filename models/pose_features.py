@@ -0,0 +1,72 @@
+import numpy as np
+
+# Shared pose-feature engine for the Yoga and Train pages.
+# MediaPipe landmarks are packed into one (33, 4) array (x, y, z, visibility)
+# and every joint angle / distance the rules need is computed in one batched call.
+
+NUM_LANDMARKS = 33
+
+# MediaPipe PoseLandmark indices used by the rules
+NOSE = 0
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+
+# name -> (a, b, c): angle at b between the segments b->a and b->c
+ANGLES = {
+    "left_elbow": (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+    "right_elbow": (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+    "left_shoulder": (LEFT_HIP, LEFT_SHOULDER, LEFT_ELBOW),
+    "right_shoulder": (RIGHT_HIP, RIGHT_SHOULDER, RIGHT_ELBOW),
+    "left_arm_raise": (LEFT_WRIST, LEFT_SHOULDER, LEFT_HIP),
+    "right_arm_raise": (RIGHT_WRIST, RIGHT_SHOULDER, RIGHT_HIP),
+    "left_hip": (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    "right_hip": (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE),
+    "left_knee": (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    "right_knee": (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE),
+}
+
+# name -> (a, b): euclidean distance in normalized image coordinates
+DISTANCES = {
+    "wrist_distance": (LEFT_WRIST, RIGHT_WRIST),
+    "ankle_distance": (LEFT_ANKLE, RIGHT_ANKLE),
+}
+
+FEATURE_NAMES = tuple(ANGLES) + tuple(DISTANCES)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+_ANGLE_IDX = np.array(list(ANGLES.values()), dtype=np.intp)
+_DIST_IDX = np.array(list(DISTANCES.values()), dtype=np.intp)
+
+
+def landmarks_to_array(landmarks):
+    # Pack results.pose_landmarks.landmark into a (33, 4) float32 array
+    return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks], dtype=np.float32)
+
+
+def joint_angles(points, triples):
+    # Angles in degrees at the middle joint of each (a, b, c) triple, wrapped to [0, 180]
+    xy = points[..., :2]
+    a = xy[..., triples[:, 0], :]
+    b = xy[..., triples[:, 1], :]
+    c = xy[..., triples[:, 2], :]
+    radians = (np.arctan2(c[..., 1] - b[..., 1], c[..., 0] - b[..., 0])
+               - np.arctan2(a[..., 1] - b[..., 1], a[..., 0] - b[..., 0]))
+    angle = np.abs(np.degrees(radians))
+    return np.where(angle > 180.0, 360.0 - angle, angle)
+
+
+def joint_distances(points, pairs):
+    xy = points[..., :2]
+    return np.linalg.norm(xy[..., pairs[:, 0], :] - xy[..., pairs[:, 1], :], axis=-1)
+
+
+def compute_features(points):
+    # Feature vector ordered by FEATURE_NAMES. Works on a single (33, 4) frame
+    # or a (frames, 33, 4) stack, in which case one row is returned per frame.
+    points = np.asarray(points, dtype=np.float32)
+    return np.concatenate([joint_angles(points, _ANGLE_IDX),
+                           joint_distances(points, _DIST_IDX)], axis=-1)
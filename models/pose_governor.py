@@ -0,0 +1,147 @@
+import logging
+import time
+
+import cv2
+
+# Adaptive MediaPipe operating point: measures pose.process time as it runs and
+# moves between model_complexity 0/1/2 and input scale to hold a target FPS.
+# A level that went over budget is retried only after a wait that grows each time it
+# fails again, so a machine that can almost afford it does not stutter between two
+# levels; a complexity whose estimator cannot be created (the heavy model is
+# downloaded on first use) is left out for the rest of the session.
+
+# (model_complexity, input scale), from most to least expensive
+OPERATING_POINTS = (
+    (2, 1.0),
+    (1, 1.0),
+    (1, 0.75),
+    (0, 0.75),
+    (0, 0.5),
+)
+
+
+class PoseGovernor:
+    """Pick the most accurate operating point whose inference time fits the FPS budget.
+
+    make_pose(model_complexity) returns a Pose estimator; one is obtained lazily per
+    complexity and kept so switching back and forth does not reload the graph.
+    release(pose) hands it back on close(), e.g. to a PosePool; without it the
+    estimators are closed.
+    """
+
+    # Frames under budget before trying a level again grow by this factor per failure
+    BACKOFF = 4
+
+    def __init__(self, make_pose, target_fps=15, start=1, smoothing=0.2,
+                 headroom=0.6, patience=15, release=None):
+        self._make_pose = make_pose
+        self._release = release
+        self._poses = {}
+        self.target_fps = target_fps
+        self.level = start
+        self.smoothing = smoothing
+        self.headroom = headroom
+        self.patience = patience
+        self.inference_ms = 0.0
+        self._over = 0
+        self._under = 0
+        self._failures = [0] * len(OPERATING_POINTS)
+        self._unavailable = set()
+        self._previous = None
+
+    @property
+    def operating_point(self):
+        return OPERATING_POINTS[self.level]
+
+    def label(self):
+        complexity, scale = self.operating_point
+        return f"model {complexity} @ {scale:.0%} input, {self.inference_ms:.0f} ms/inference (target {self.target_fps} fps)"
+
+    def process(self, image):
+        # Same contract as Pose.process: RGB image in, results with normalized landmarks out
+        pose = self._pose()
+        complexity, scale = self.operating_point
+        if scale != 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        started = time.perf_counter()
+        results = pose.process(image)
+        self._update(time.perf_counter() - started)
+        return results
+
+    def _pose(self):
+        # Estimator of the current level, moving to another level when it cannot be made
+        while True:
+            complexity = self.operating_point[0]
+            pose = self._poses.get(complexity)
+            if pose is not None:
+                return pose
+            try:
+                pose = self._poses[complexity] = self._make_pose(complexity)
+                return pose
+            except Exception as e:
+                logging.error(f"Pose model complexity {complexity} is unavailable: {e}")
+                self._unavailable.add(complexity)
+                fallback = self._fallback()
+                if fallback is None:
+                    raise
+                self._switch(fallback)
+
+    def _usable(self, level):
+        return 0 <= level < len(OPERATING_POINTS) and OPERATING_POINTS[level][0] not in self._unavailable
+
+    def _fallback(self):
+        # The level we came from, else the nearest cheaper one, else the nearest costlier one
+        if self._previous is not None and self._usable(self._previous):
+            return self._previous
+        cheaper = [k for k in range(self.level + 1, len(OPERATING_POINTS)) if self._usable(k)]
+        costlier = [k for k in range(self.level - 1, -1, -1) if self._usable(k)]
+        return (cheaper or costlier or [None])[0]
+
+    def _update(self, seconds):
+        ms = 1000.0 * seconds
+        if self.inference_ms:
+            self.inference_ms += self.smoothing * (ms - self.inference_ms)
+        else:
+            self.inference_ms = ms
+        budget = 1000.0 / self.target_fps
+        if self.inference_ms > budget:
+            self._over += 1
+            self._under = 0
+        elif self.inference_ms < budget * self.headroom:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        cheaper = next((k for k in range(self.level + 1, len(OPERATING_POINTS)) if self._usable(k)), None)
+        costlier = next((k for k in range(self.level - 1, -1, -1) if self._usable(k)), None)
+        if self._over >= self.patience and cheaper is not None:
+            self._failures[self.level] += 1
+            self._switch(cheaper)
+        elif costlier is not None and self._under >= 2 * self.patience * self.BACKOFF ** self._failures[costlier]:
+            self._switch(costlier)
+
+    def _switch(self, level):
+        complexity = OPERATING_POINTS[level][0]
+        pose = self._poses.get(complexity) if complexity != self.operating_point[0] else None
+        self._previous = self.level
+        self.level = level
+        self.inference_ms = 0.0
+        self._over = self._under = 0
+        # An estimator kept from earlier is still tracking where the person was back then
+        if pose is not None and hasattr(pose, "reset"):
+            pose.reset()
+
+    def reset(self):
+        # Drop the tracking state, e.g. when the framing of the input changes
+        for pose in self._poses.values():
+            if hasattr(pose, "reset"):
+                pose.reset()
+
+    def close(self):
+        for pose in self._poses.values():
+            if self._release is not None:
+                self._release(pose)
+            else:
+                pose.close()
+        self._poses = {}
@@ -0,0 +1,85 @@
+import logging
+import threading
+
+import numpy as np
+
+# Process-wide pool of MediaPipe Pose estimators. Building a Pose graph is a large
+# part of "Start Camera" latency, so estimators are created once per server process
+# (this module survives Streamlit reruns), warmed on a dummy frame and leased to one
+# camera session at a time. Instances are keyed by their settings.
+
+
+class PosePool:
+
+    def __init__(self, max_idle=2):
+        self.max_idle = max_idle
+        self._idle = {}
+        self._leased = {}
+        self._lock = threading.Lock()
+        self._warm_thread = None
+
+    @staticmethod
+    def key(model_complexity=1, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        return (int(model_complexity), round(float(min_detection_confidence), 2),
+                round(float(min_tracking_confidence), 2))
+
+    def _create(self, key):
+        import mediapipe as mp
+
+        model_complexity, detection, tracking = key
+        pose = mp.solutions.pose.Pose(model_complexity=model_complexity,
+                                      min_detection_confidence=detection,
+                                      min_tracking_confidence=tracking)
+        # First process() call loads the model files and allocates the graph buffers
+        pose.process(np.zeros((256, 256, 3), dtype=np.uint8))
+        return pose
+
+    def acquire(self, model_complexity=1, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        key = self.key(model_complexity, min_detection_confidence, min_tracking_confidence)
+        with self._lock:
+            idle = self._idle.get(key)
+            pose = idle.pop() if idle else None
+        if pose is None:
+            pose = self._create(key)
+        elif hasattr(pose, "reset"):
+            # Drop the previous session's tracking state
+            pose.reset()
+        with self._lock:
+            self._leased[id(pose)] = key
+        return pose
+
+    def release(self, pose):
+        with self._lock:
+            key = self._leased.pop(id(pose), None)
+            idle = self._idle.setdefault(key, []) if key is not None else None
+            if idle is not None and len(idle) < self.max_idle:
+                idle.append(pose)
+                return
+        pose.close()
+
+    def warm(self, settings=((1, 0.5, 0.5),)):
+        # Make sure at least one ready estimator exists for each settings tuple
+        for setting in settings:
+            key = self.key(*setting)
+            with self._lock:
+                if self._idle.get(key):
+                    continue
+            try:
+                pose = self._create(key)
+            except Exception as e:
+                logging.error(f"Pose warm-up failed for {key}: {e}")
+                continue
+            with self._lock:
+                self._idle.setdefault(key, []).append(pose)
+
+    def warm_async(self, settings=((1, 0.5, 0.5),)):
+        # Warm once per process in the background; later calls are no-ops
+        with self._lock:
+            if self._warm_thread is not None:
+                return self._warm_thread
+            self._warm_thread = threading.Thread(target=self.warm, args=(settings,), name="pose-warmup", daemon=True)
+        self._warm_thread.start()
+        return self._warm_thread
+
+
+POOL = PosePool()
@@ -0,0 +1,106 @@
+import cv2
+import numpy as np
+
+from pose_features import landmarks_to_array
+
+# Region-of-interest tracking for pose inference. The bounding box of the previous
+# frame's landmarks is used to crop (and downscale) the next frame before it reaches
+# pose.process; landmarks are mapped back to full-frame coordinates afterwards.
+# When the person is lost the tracker falls back to a full-frame pass.
+#
+# MediaPipe Pose in video mode carries its own region of interest from one frame to
+# the next in the coordinates of the image it was given, so the crop is only moved
+# when the landmarks leave it (or it has grown far too large for them), and the
+# estimator is reset whenever the view it sees changes: a new crop box, or a switch
+# between crop and full frame.
+
+
+class RoiTracker:
+
+    def __init__(self, process, margin=0.25, min_visibility=0.5, max_side=320, enabled=True, reset=None):
+        self._process = process
+        self._reset = reset
+        self.margin = margin
+        self.min_visibility = min_visibility
+        self.max_side = max_side
+        self.enabled = enabled
+        self.box = None  # (x0, y0, x1, y1) in normalized full-frame coordinates
+        self._view = None  # what the estimator saw last: a box, or None for the full frame
+
+    @property
+    def tracking(self):
+        return self.box is not None
+
+    def reset(self):
+        self.box = None
+
+    def _see(self, view):
+        # Stale tracking state of another view would be read in the wrong coordinates
+        if view != self._view and self._reset is not None:
+            self._reset()
+        self._view = view
+
+    def process(self, image):
+        # Same contract as Pose.process on an RGB frame
+        if self.enabled and self.box is not None:
+            results = self._process_crop(image, self.box)
+            if results.pose_landmarks:
+                self.box = self._follow(results.pose_landmarks.landmark)
+                return results
+        # No previous box, or tracking lost: full-frame pass
+        self._see(None)
+        results = self._process(image)
+        self.box = self._box_from(results.pose_landmarks.landmark) if (self.enabled and results.pose_landmarks) else None
+        return results
+
+    def _follow(self, landmarks):
+        # Keep the current crop while the person, with half the margin, is still inside it
+        # and fills a fair part of it; otherwise move it to the fully padded box
+        box = self._box_from(landmarks)
+        if box is None:
+            return None
+        near = self._box_from(landmarks, self.margin / 2)
+        x0, y0, x1, y1 = self.box
+        inside = near[0] >= x0 and near[1] >= y0 and near[2] <= x1 and near[3] <= y1
+        loose = (x1 - x0) * (y1 - y0) > 2 * (box[2] - box[0]) * (box[3] - box[1])
+        return self.box if inside and not loose else box
+
+    def _process_crop(self, image, box):
+        h, w = image.shape[:2]
+        x0, y0, x1, y1 = box
+        left, top = int(x0 * w), int(y0 * h)
+        right, bottom = max(int(np.ceil(x1 * w)), left + 1), max(int(np.ceil(y1 * h)), top + 1)
+        crop = image[top:bottom, left:right]
+        longest = max(crop.shape[:2])
+        if self.max_side and longest > self.max_side:
+            factor = self.max_side / longest
+            crop = cv2.resize(crop, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        else:
+            crop = np.ascontiguousarray(crop)
+
+        self._see(box)
+        results = self._process(crop)
+        if results.pose_landmarks:
+            # Crop-normalized -> frame-normalized
+            sx, sy = (right - left) / w, (bottom - top) / h
+            ox, oy = left / w, top / h
+            for lm in results.pose_landmarks.landmark:
+                lm.x = ox + lm.x * sx
+                lm.y = oy + lm.y * sy
+                lm.z = lm.z * sx
+        return results
+
+    def _box_from(self, landmarks, margin=None):
+        pts = landmarks_to_array(landmarks)[:, [0, 1, 3]]
+        visible = pts[pts[:, 2] >= self.min_visibility]
+        if len(visible) < 4:
+            return None
+        x0, y0 = visible[:, :2].min(axis=0)
+        x1, y1 = visible[:, :2].max(axis=0)
+        # Pad the box so limbs moving between frames stay inside the crop
+        pad = (self.margin if margin is None else margin) * max(x1 - x0, y1 - y0)
+        box = (max(float(x0 - pad), 0.0), max(float(y0 - pad), 0.0),
+               min(float(x1 + pad), 1.0), min(float(y1 + pad), 1.0))
+        if box[2] - box[0] <= 0 or box[3] - box[1] <= 0:
+            return None
+        return box
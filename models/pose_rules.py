@@ -0,0 +1,35 @@
+import numpy as np
+
+from pose_features import FEATURE_INDEX, FEATURE_NAMES
+
+# Declarative pose rules. Each pose is a dict of {feature: (low, high)} open ranges
+# (None for an unbounded side) over the features from pose_features. The whole
+# library is compiled into two (poses, features) bound matrices so every pose is
+# checked against a frame's feature vector in one vectorized comparison.
+
+
+class PoseRules:
+
+    def __init__(self, poses):
+        # poses: {name: {"rules": {feature: (low, high)}, "hold": seconds, ...}}
+        self.names = tuple(poses)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.specs = poses
+        self.lows = np.full((len(self.names), len(FEATURE_NAMES)), -np.inf, dtype=np.float32)
+        self.highs = np.full((len(self.names), len(FEATURE_NAMES)), np.inf, dtype=np.float32)
+        self.hold = np.array([poses[name].get("hold", 0) for name in self.names], dtype=np.float32)
+
+        for row, name in enumerate(self.names):
+            for feature, (low, high) in poses[name]["rules"].items():
+                if feature not in FEATURE_INDEX:
+                    raise ValueError(f"Unknown feature '{feature}' in pose '{name}'")
+                col = FEATURE_INDEX[feature]
+                if low is not None:
+                    self.lows[row, col] = low
+                if high is not None:
+                    self.highs[row, col] = high
+
+    def evaluate(self, features):
+        # (features,) -> (poses,) bool, or (frames, features) -> (frames, poses)
+        features = np.asarray(features, dtype=np.float32)[..., None, :]
+        return np.all((features > self.lows) & (features < self.highs), axis=-1)
@@ -0,0 +1,109 @@
+import math
+import time
+
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+from pose_features import landmarks_to_array
+
+# Inference frame-skipping with temporal landmark smoothing.
+# MediaPipe only runs on every Nth frame; the frames in between get landmarks
+# extrapolated with the velocity tracked by a One-Euro filter, which also removes
+# the jitter that makes the Correct/Incorrect verdicts flicker.
+
+
+class OneEuroFilter:
+    # One-Euro filter (Casiez et al.) applied element-wise to a landmark array
+
+    def __init__(self, min_cutoff=1.5, beta=0.5, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.velocity = None
+        self.timestamp = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, x, timestamp):
+        if self.value is None:
+            self.value = x.copy()
+            self.velocity = np.zeros_like(x)
+            self.timestamp = timestamp
+            return self.value
+        dt = max(timestamp - self.timestamp, 1e-3)
+        velocity = (x - self.value) / dt
+        self.velocity += self._alpha(self.d_cutoff, dt) * (velocity - self.velocity)
+        cutoff = self.min_cutoff + self.beta * np.abs(self.velocity)
+        self.value += self._alpha(cutoff, dt) * (x - self.value)
+        self.timestamp = timestamp
+        return self.value
+
+    def predict(self, timestamp):
+        # Constant-velocity extrapolation from the last filtered state
+        return self.value + self.velocity * (timestamp - self.timestamp)
+
+
+class PoseResult:
+    # Stand-in for MediaPipe's results: smoothed (33, 4) points plus a landmark list for drawing,
+    # stamped with the monotonic time the frame was processed
+
+    def __init__(self, points=None, inferred=True, timestamp=None):
+        self.points = points
+        self.inferred = inferred
+        self.timestamp = time.perf_counter() if timestamp is None else timestamp
+        self._landmarks = None
+
+    @property
+    def pose_landmarks(self):
+        # Built on first use only; the pages draw straight from points
+        if self._landmarks is None and self.points is not None:
+            self._landmarks = to_landmark_list(self.points)
+        return self._landmarks
+
+
+def to_landmark_list(points):
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility in points.tolist():
+        landmarks.landmark.add(x=x, y=y, z=z, visibility=visibility)
+    return landmarks
+
+
+class FrameSkipper:
+    """Run process(frame) on every Nth frame and predict the landmarks in between.
+
+    process is the full inference chain (colour conversion, ROI, governor) and
+    returns MediaPipe results; every call here returns a PoseResult.
+    """
+
+    def __init__(self, process, every_n=1, max_predict=0.25, **filter_args):
+        self._process = process
+        self.every_n = every_n
+        self.max_predict = max_predict  # seconds a prediction may run ahead of the last inference
+        self.filter = OneEuroFilter(**filter_args)
+        self._frame = 0
+
+    def process(self, frame, timestamp=None):
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        skip = self._frame % max(self.every_n, 1) != 0
+        self._frame += 1
+
+        state = self.filter
+        if skip and state.value is not None and timestamp - state.timestamp <= self.max_predict:
+            points = state.predict(timestamp)
+            # Visibility is not extrapolated
+            points[:, 3] = state.value[:, 3]
+            return PoseResult(points, inferred=False, timestamp=timestamp)
+
+        results = self._process(frame)
+        if not results.pose_landmarks:
+            state.reset()
+            return PoseResult(None, timestamp=timestamp)
+        points = landmarks_to_array(results.pose_landmarks.landmark)
+        return PoseResult(state(points, timestamp).copy(), timestamp=timestamp)
@@ -0,0 +1,137 @@
+from collections import namedtuple
+
+import numpy as np
+
+from pose_features import ANGLES, FEATURE_INDEX
+
+# Rep counting for the Train page. Every (exercise, side) pair is a track that
+# follows one joint angle from the shared feature vector; all tracks are updated
+# together with a few vectorized operations per frame, so watching several
+# exercises on both sides costs about the same as the old single-angle check.
+#
+# Each track switches stage only when the angle crosses the far threshold
+# (hysteresis), and a rep is counted on the transition into `count_at`.
+# A smoothed angular velocity splits every rep into closing / opening time.
+#
+# Bilateral movements (squat, push-up) count once per rep, the larger of the side
+# counts. Curls may be done with both arms together or alternating, so a side's rep
+# adds to the exercise count unless it pairs with a rep the other arm completed
+# within `pair_window` seconds that was not paired yet.
+
+# stage names are (above `high`, below `low`)
+EXERCISES = {
+    "Bicep Curl": {"joint": "elbow", "high": 150, "low": 40, "count_at": "low",
+                   "stages": ("down", "up"), "bilateral": False},
+    "Squat": {"joint": "knee", "high": 160, "low": 90, "count_at": "high",
+              "stages": ("up", "down"), "bilateral": True},
+    "Push-up": {"joint": "elbow", "high": 155, "low": 90, "count_at": "high",
+                "stages": ("up", "down"), "bilateral": True},
+}
+
+SIDES = ("left", "right")
+
+# duration / closing / opening in seconds, ROM in degrees
+RepStat = namedtuple("RepStat", "exercise side rep duration closing opening rom")
+
+_UNKNOWN, _HIGH, _LOW = 0, 1, 2
+
+
+class RepCounter:
+
+    def __init__(self, exercises=None, sides=SIDES, min_speed=20.0, smoothing=0.5, pair_window=0.6):
+        self.exercises = tuple(exercises or EXERCISES)
+        self.tracks = [(name, side) for name in self.exercises for side in sides]
+        specs = [EXERCISES[name] for name, _ in self.tracks]
+        self.columns = np.array([FEATURE_INDEX[f"{side}_{EXERCISES[name]['joint']}"] for name, side in self.tracks])
+        self.highs = np.array([spec["high"] for spec in specs], dtype=np.float32)
+        self.lows = np.array([spec["low"] for spec in specs], dtype=np.float32)
+        self.targets = np.array([_HIGH if spec["count_at"] == "high" else _LOW for spec in specs], dtype=np.int8)
+        self.min_speed = min_speed
+        self.smoothing = smoothing
+        self.pair_window = pair_window
+        self._partners = [[j for j, (other, _) in enumerate(self.tracks) if other == name and j != k]
+                          for k, (name, _) in enumerate(self.tracks)]
+        self.reset()
+
+    def reset(self):
+        n = len(self.tracks)
+        self.stage = np.zeros(n, dtype=np.int8)
+        self.reps = np.zeros(n, dtype=np.int32)
+        self.counts = dict.fromkeys(self.exercises, 0)
+        self._last_rep = np.full(n, -np.inf)
+        self._paired = np.zeros(n, dtype=bool)
+        self.velocity = np.zeros(n, dtype=np.float32)
+        self.history = []
+        self._angles = np.full(n, np.nan, dtype=np.float32)
+        self._time = None
+        self._changed = np.zeros(n)
+        self._rep_start = np.full(n, np.nan)
+        self._rep_min = np.full(n, np.inf, dtype=np.float32)
+        self._rep_max = np.full(n, -np.inf, dtype=np.float32)
+        self._closing = np.zeros(n)
+        self._opening = np.zeros(n)
+
+    def update(self, features, timestamp):
+        # Returns a (tracks,) bool mask of the tracks that completed a rep on this frame
+        angles = features[self.columns]
+        valid = ~np.isnan(angles)
+
+        if self._time is not None and timestamp > self._time:
+            dt = timestamp - self._time
+            moving = valid & ~np.isnan(self._angles)
+            speed = np.where(moving, (angles - self._angles) / dt, 0)
+            self.velocity = np.where(moving, self.velocity + self.smoothing * (speed - self.velocity), 0)
+            self._closing += dt * (self.velocity < -self.min_speed)
+            self._opening += dt * (self.velocity > self.min_speed)
+        self._time = timestamp
+        self._angles = angles
+        self._rep_start = np.where(np.isnan(self._rep_start) & valid, timestamp, self._rep_start)
+        self._rep_min = np.fmin(self._rep_min, angles)
+        self._rep_max = np.fmax(self._rep_max, angles)
+
+        # NaN angles fail both comparisons and keep their stage
+        stage = np.where(angles > self.highs, _HIGH, np.where(angles < self.lows, _LOW, self.stage)).astype(np.int8)
+        self._changed = np.where(stage != self.stage, timestamp, self._changed)
+        completed = (stage == self.targets) & (self.stage != self.targets) & (self.stage != _UNKNOWN)
+        self.stage = stage
+
+        if completed.any():
+            self.reps += completed
+            for k in np.flatnonzero(completed):
+                name, side = self.tracks[k]
+                self._count(k, name, timestamp)
+                self.history.append(RepStat(name, side, int(self.reps[k]), float(timestamp - self._rep_start[k]),
+                                            float(self._closing[k]), float(self._opening[k]),
+                                            float(self._rep_max[k] - self._rep_min[k])))
+            self._rep_start[completed] = timestamp
+            self._rep_min[completed] = angles[completed]
+            self._rep_max[completed] = angles[completed]
+            self._closing[completed] = 0
+            self._opening[completed] = 0
+        return completed
+
+    def _count(self, k, name, timestamp):
+        # Exercise-level count of a unilateral exercise; see the module comment
+        partner = next((j for j in self._partners[k]
+                        if timestamp - self._last_rep[j] <= self.pair_window and not self._paired[j]), None)
+        if partner is None:
+            self.counts[name] += 1
+            self._paired[k] = False
+        else:
+            self._paired[[k, partner]] = True
+        self._last_rep[k] = timestamp
+
+    def summary(self, exercise):
+        # (reps, stage name, last RepStat) for one exercise across its sides
+        spec = EXERCISES[exercise]
+        rows = [k for k, (name, _) in enumerate(self.tracks) if name == exercise]
+        reps = self.reps[rows].max() if spec["bilateral"] else self.counts[exercise]
+        latest = max(rows, key=lambda k: self._changed[k])
+        stage = spec["stages"][self.stage[latest] - 1] if self.stage[latest] else None
+        last = next((stat for stat in reversed(self.history) if stat.exercise == exercise), None)
+        return int(reps), stage, last
+
+
+def joint_landmark(exercise, side="left"):
+    # Landmark index of the vertex of the angle an exercise follows
+    return ANGLES[f"{side}_{EXERCISES[exercise]['joint']}"][1]
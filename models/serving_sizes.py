@@ -0,0 +1,196 @@
+import argparse
+import math
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from food_search import words
+from nutrient_store import FOOD_TABLE, SERVING_TABLE, get_store
+
+# Serving sizes for the Nutrition page. food.csv lists ~560 everyday foods with a
+# household serving ("1 artichoke (128 g)") and its calories; food1.csv has the USDA
+# per-100 g rows. This joins the two once, ahead of time: every serving string is
+# parsed to grams and every food name is matched to an NDB_No by its words (or their
+# USDA abbreviations), with the listed calories deciding between equally good name
+# matches and confirming the looser ones. The join is written to
+# food_servings.csv, which the nutrient store loads at start-up, so a page lookup is
+# still a dict hit while "1 serving" means a real portion instead of 100 g.
+#
+#   python serving_sizes.py --build
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVING_SOURCE = os.path.join(HERE, "food.csv")
+
+# "(128 g)", "(1,040 g)", "(14 ml)"; a millilitre is taken as a gram
+_GRAMS = re.compile(r"\(\s*([\d.,]+)\s*(g|ml)\s*\)", re.IGNORECASE)
+# Filler words of the common names ("Chicken with Rice Soup", "Ben and Jerry's")
+_STOP_WORDS = {"A", "AND", "IN", "OF", "S", "THE", "WITH"}
+# Description words that make a different product of the same food ("LEMON JUICE",
+# "RICE FLOUR,BROWN", "POTATOES,RAW,SKIN"); a row with one only matches a name that has it
+_PRODUCT_WORDS = {"JUICE", "JUC", "NECTAR", "FLOUR", "MEAL", "SKIN", "ROLLS", "LECITHIN", "TENDERS", "BABYFOOD"}
+# Common names and spellings -> the words and abbreviations USDA descriptions use
+_SYNONYMS = {
+    "AUBERGINE": ("EGGPLANT",), "BEETROOT": ("BEETS",), "BEEF": ("BF",), "BELL": ("SWT",),
+    "BROTH": ("BOUILLON",), "CAPSICUM": ("PEPPERS",), "CHEESE": ("CHS",), "CHICKEN": ("CHICK",),
+    "CHOCOLATE": ("CHOC",), "COURGETTE": ("ZUCCHINI",), "CREAM": ("CRM",),
+    "GREEN": ("GRN",), "LYCHEE": ("LITCHIS",), "MUSHROOM": ("MSHRM",),
+    "STOCK": ("BROTH",), "SWEET": ("SWT",), "VEGETABLE": ("VEG",),
+}
+# Words that name a variety of a food rather than the food ("Black Olives", "Cherry
+# Tomato"); a name may match without them when nothing has them all
+_VARIETY_WORDS = {"BABY", "BLACK", "BLOOD", "CHERRY", "GREEN", "RED", "WHITE", "YELLOW"}
+# A match whose calories per 100 g are off by more than this factor is a different food
+MAX_CALORIE_RATIO = 2.0
+# Corrections from reviewing the built table by hand: the right USDA row where the
+# words picked another form of the food, None where there is no good one
+REVIEWED = {
+    "Acai": None,
+    "Apple": "APPLES,RAW,WITH SKIN",
+    "BBQ Rib": None,
+    "Bean Burrito": "TACO BELL,BEAN BURRITO",
+    "Black Pudding": None,
+    "Black Rice": None,
+    "Brown Rice": "RICE,BROWN,MEDIUM-GRAIN,RAW",
+    "Burger King Double Whopper with Cheese": "BURGER KING,DOUBLE WHOPPER,W/ CHS",
+    "Burrito": None,
+    "Butter Pecan Ice Cream": None,
+    "Capsicum": "PEPPERS,SWT,RED,RAW",
+    "Chicken Breast": "CHICKEN,BROILERS OR FRYERS,BREAST,MEAT ONLY,CKD,RSTD",
+    "Chicken Wings": "CHICKEN,BROILERS OR FRYERS,WING,MEAT&SKN,CKD,RSTD",
+    "Corn Oil": "OIL,CORN,INDUSTRIAL & RTL,ALLPURP SALAD OR COOKING",
+    "Cornmeal": "CORNMEAL,WHOLE-GRAIN,YEL",
+    "Drumsticks": None,
+    "Grilled Cheese Sandwich": None,
+    "Lemon": "LEMONS,RAW,WITHOUT PEEL",
+    "Macaroni": "PASTA,DRY,ENR",
+    "Meatloaf": None,
+    "Mushroom Soup": "SOUP,CRM OF MUSHROOM,CND,PREP W/ EQ VOLUME H2O",
+    "Noodle Soup": "SOUP,CHICK NOODLE,CND,PREP W/ EQ VOLUME H2O",
+    "Onion Soup": None,
+    "Pea Soup": "SOUP,PEA,GRN,CND,PREP W/ EQ VOLUME H2O",
+    "Peanut Oil": None,
+    "Pepper": "PEPPERS,SWT,GRN,RAW",
+    "Pizza": "PIZZA,CHS TOPPING,REG CRUST,FRZ,CKD",
+    "Potato": "POTATOES,FLESH & SKN,RAW",
+    "Potato Soup": "SOUP,CRM OF POTATO,CND,PREP W/ EQ VOLUME MILK",
+    "Roast Beef": None,
+    "Sausage Rolls": None,
+    "Shells": "PASTA,DRY,ENR",
+    "Soy Oil": "OIL,SOYBN,SALAD OR COOKING",
+    "Spaghetti": "PASTA,DRY,ENR",
+    "Taco": "FAST FOODS,TACO W/ BF,CHS & LETTUCE,HARD SHELL",
+    "Tomato": "TOMATOES,RED,RIPE,RAW,YEAR RND AVERAGE",
+    "Tomato Rice Soup": "SOUP,TOMATO RICE,CND,PREP W/ EQ VOLUME H2O",
+    "Vegetable Oil": None,
+    "Vermicelli": "PASTA,DRY,ENR",
+    "Wheat Semolina": "SEMOLINA,ENRICHED",
+    "White Pizza": None,
+    "Whole Grain Wheat": "WHEAT FLOUR,WHOLE-GRAIN",
+    "zone": None,
+}
+
+
+def parse_serving(text):
+    # "1 cup, chopped (56 g)" -> 56.0, nan when no weight is given
+    match = _GRAMS.search(str(text))
+    return float(match.group(1).replace(",", "")) if match else math.nan
+
+
+def _query_words(name):
+    # Plurals reduced to a prefix of the USDA word ("RAISINS" finds "RAISINS" and "RAISIN")
+    return [w[:-1] if len(w) > 3 and w.endswith("S") else w for w in words(name) if w not in _STOP_WORDS]
+
+
+def _word_hits(search, query, heads=False):
+    # (query words, descriptions) like FoodSearch.word_hits, a synonym counting as the word
+    return np.array([search.word_hits([w, *_SYNONYMS.get(w, ())], heads).any(axis=0) for w in query])
+
+
+def match_food(store, name, grams=math.nan, calories=math.nan):
+    # Common food name -> store row, -1 when nothing in the table is close enough
+    if name in REVIEWED:
+        return -1 if REVIEWED[name] is None else store.row(REVIEWED[name])
+    query = _query_words(name)
+    if not query:
+        return -1
+    search = store.search
+    products = [w for w in _PRODUCT_WORDS if not any(w.startswith(q) for q in query)]
+    allowed = ~search.word_hits(products, exact=True).any(axis=0)
+    hits = _word_hits(search, query)
+    heads = _word_hits(search, query, heads=True).any(axis=0)
+    checked = grams > 0 and calories >= 0
+    # Best first: every word of the name with one of them as the description's first
+    # word, the food itself ("SALAD DRSNG,RANCH" is not a "Cobb Salad"); then, only
+    # where the calories confirm it, every word anywhere ("SQUASH,SMMR,ZUCCHINI") or
+    # the name without its variety words ("COLLARDS" for "Collard Greens")
+    tiers = [hits.all(axis=0) & heads]
+    if checked:
+        tiers.append(hits.all(axis=0))
+        food = [w for w in query if w not in _VARIETY_WORDS]
+        if food and len(food) < len(query):
+            tiers.append(_word_hits(search, food).all(axis=0) & _word_hits(search, food, heads=True).any(axis=0))
+    for tier in tiers:
+        candidates = np.flatnonzero(tier & allowed)
+        if not len(candidates):
+            continue
+        rows = store.rows([search.descriptions[c] for c in candidates])
+        # Fewest words beyond the name first: "TURKEY,WHL,..." before "TURKEY,PORK,&BF SAUSAGE,..."
+        extra = np.array([len(words(search.descriptions[c])) for c in candidates]) - len(query)
+        rank = search.scores(" ".join([name, *(w for q in query for w in _SYNONYMS.get(q, ()))]))[candidates]
+        rank -= 0.25 * extra
+        if not checked:
+            return int(rows[rank.argmax()])
+        kcal = np.asarray(store.matrix[rows, store.column_index["Energ_Kcal"]])
+        offset = np.abs(np.log((kcal + 5) / (calories * 100 / grams + 5)))
+        rank -= 0.75 * offset
+        best = int(rank.argmax())
+        if offset[best] <= math.log(MAX_CALORIE_RATIO):
+            return int(rows[best])
+    return -1
+
+
+def build_table(store, source=SERVING_SOURCE, out=SERVING_TABLE):
+    foods = pd.read_csv(source, encoding="latin-1")
+    grams = foods["Serving"].map(parse_serving)
+    rows = np.array([match_food(store, name, g, kcal)
+                     for name, g, kcal in zip(foods["Food"], grams, foods["Calories"])], dtype=np.intp)
+    matched = (rows >= 0) & (grams > 0)
+    table = pd.DataFrame({
+        "Food": foods["Food"][matched].to_numpy(),
+        "Serving": foods["Serving"][matched].to_numpy(),
+        "Grams": grams[matched].to_numpy(),
+        "Calories": foods["Calories"][matched].to_numpy(),
+        "NDB_No": store.ndb[rows[matched]],
+        "Shrt_Desc": store.descriptions[rows[matched]],
+    })
+    # What the USDA row gives for the serving, to eyeball the match against Calories
+    table["Matched_Kcal"] = np.round(table["Grams"] * store.matrix[rows[matched], store.column_index["Energ_Kcal"]]
+                                     / 100).astype(int)
+    # One serving per USDA row: the food whose listed calories agree best with it
+    # ("Ramen" is listed twice, "Whopper" and "Burger King Whopper" are the same row)
+    agreement = np.abs(np.log((table["Matched_Kcal"] + 5) / (table["Calories"] + 5)))
+    order = np.lexsort((table["Food"].to_numpy(), agreement.to_numpy()))
+    duplicate = table.iloc[order]["NDB_No"].duplicated()
+    table = table.iloc[order][~duplicate.to_numpy()].sort_index()
+    table.to_csv(out, index=False)
+    return table, foods["Food"][~matched].tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match food.csv servings to the USDA nutrient table")
+    parser.add_argument("--build", action="store_true", help="rebuild even if the table is up to date")
+    parser.add_argument("--source", default=SERVING_SOURCE)
+    parser.add_argument("--foods", default=FOOD_TABLE, help="USDA nutrient table")
+    parser.add_argument("--out", default=SERVING_TABLE)
+    args = parser.parse_args()
+
+    if args.build or not os.path.exists(args.out) or os.path.getmtime(args.out) < os.path.getmtime(args.source):
+        table, unmatched = build_table(get_store(args.foods), args.source, args.out)
+        print(f"{len(table)} servings matched, {len(unmatched)} without a USDA row: {', '.join(unmatched)}")
+    print(f"{len(pd.read_csv(args.out))} servings in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+from pose_features import FEATURE_NAMES, NUM_LANDMARKS
+from pose_smoothing import PoseResult
+
+# Compact landmark session logs. Every frame's timestamp, landmarks, features,
+# rule verdicts and a small integer state (rep count, pose index) is appended to
+# preallocated float16 / uint8 chunks that are written as .npz files when full.
+# A 10-minute session is a few MB instead of a video file, and SessionLog replays
+# it through the same render functions the pages use, at any speed.
+#
+#   python session_log.py sessions/<user>/<session>/ --speed 4
+
+SESSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions")
+
+
+class SessionRecorder:
+
+    def __init__(self, path, pose_names=(), chunk_size=900, meta=None):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.chunk_size = chunk_size
+        self.pose_names = tuple(pose_names)
+        self.frames = 0
+        self._chunk = 0
+        self._allocate()
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"features": FEATURE_NAMES, "poses": self.pose_names,
+                       "created": time.time(), **(meta or {})}, f)
+
+    def _allocate(self):
+        n = self.chunk_size
+        self._timestamps = np.zeros(n, dtype=np.float64)
+        self._points = np.full((n, NUM_LANDMARKS, 4), np.nan, dtype=np.float16)
+        self._features = np.full((n, len(FEATURE_NAMES)), np.nan, dtype=np.float16)
+        self._verdicts = np.zeros((n, len(self.pose_names)), dtype=np.uint8)
+        self._state = np.zeros(n, dtype=np.int16)
+        self._used = 0
+
+    def append(self, timestamp, points=None, features=None, verdicts=None, state=0):
+        # Missing landmarks / features are stored as NaN rows
+        k = self._used
+        self._timestamps[k] = timestamp
+        self._points[k] = np.nan if points is None else points
+        self._features[k] = np.nan if features is None else features
+        self._verdicts[k] = 0 if verdicts is None else verdicts
+        self._state[k] = state
+        self._used += 1
+        self.frames += 1
+        if self._used == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self._used:
+            return
+        k = self._used
+        np.savez(os.path.join(self.path, f"chunk_{self._chunk:05d}.npz"),
+                 timestamps=self._timestamps[:k], points=self._points[:k], features=self._features[:k],
+                 verdicts=self._verdicts[:k], state=self._state[:k])
+        self._chunk += 1
+        self._allocate()
+
+    def close(self):
+        self.flush()
+
+
+class SessionLog:
+    # Reader for a recorded session directory
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        chunks = [np.load(name) for name in sorted(glob.glob(os.path.join(path, "chunk_*.npz")))]
+        if not chunks:
+            raise ValueError(f"No frames recorded in {path}")
+        columns = ("timestamps", "points", "features", "verdicts", "state")
+        data = {column: np.concatenate([chunk[column] for chunk in chunks]) for column in columns}
+        self.timestamps = data["timestamps"]
+        self.points = data["points"].astype(np.float32)
+        self.features = data["features"].astype(np.float32)
+        self.verdicts = data["verdicts"].astype(bool)
+        self.state = data["state"]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def replay(self, speed=1.0):
+        # Yield PoseResults paced by the recorded timestamps; speed=0 replays as fast as possible
+        start_wall, start_rec = time.perf_counter(), self.timestamps[0]
+        for timestamp, points in zip(self.timestamps, self.points):
+            if speed > 0:
+                wait = (timestamp - start_rec) / speed - (time.perf_counter() - start_wall)
+                if wait > 0:
+                    time.sleep(wait)
+            yield PoseResult(None if np.isnan(points).any() else points, timestamp=float(timestamp))
+
+
+def new_session_path(user, kind):
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(SESSIONS_DIR, str(user or "anonymous"), f"{stamp}-{kind}")
+
+
+def main():
+    # Re-run a recording through the current rules, e.g. after changing an asana's bounds
+    from asana_library import get_recognizer
+    from batch_analysis import count_reps, track_progress
+    from pose_features import compute_features
+    from yoga_tracks import RULES, TRACKS
+
+    parser = argparse.ArgumentParser(description="Replay a recorded landmark session through the pose rules")
+    parser.add_argument("session", help="session directory")
+    parser.add_argument("--speed", type=float, default=0, help="playback speed, 0 for as fast as possible")
+    args = parser.parse_args()
+
+    log = SessionLog(args.session)
+    times, features = [], []
+    for result in log.replay(args.speed):
+        times.append(result.timestamp)
+        features.append(compute_features(result.points) if result.points is not None
+                        else np.full(len(FEATURE_NAMES), np.nan, dtype=np.float32))
+    times, features = np.asarray(times), np.asarray(features)
+    print(f"{len(log)} frames, {times[-1] - times[0]:.1f}s recorded")
+    if "track" in log.meta:
+        pose_number, held = track_progress(RULES.evaluate(features), times, TRACKS[log.meta["track"]])
+        print(f"{log.meta['track']}: reached pose {pose_number[-1]} of {len(TRACKS[log.meta['track']])}")
+    elif log.meta.get("mode") == "free_flow":
+        recognizer = get_recognizer()
+        recognized = [recognizer.classify(row)[0] for row in features]
+        names = [name for k, name in enumerate(recognized) if name and (k == 0 or recognized[k - 1] != name)]
+        print(f"Free flow: {' -> '.join(names) or 'no asana recognized'}")
+    else:
+        exercise = log.meta.get("exercise", "Bicep Curl")
+        stages, reps = count_reps(features, times, exercise)
+        print(f"{exercise}: {reps[-1]} reps (recorded {int(log.state[-1])})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+from pose_rules import PoseRules
+
+# Asana library and Yoga tracks. Each asana lists the joint features it checks
+# as (low, high) ranges in degrees (distances in normalized image units), how long
+# it must be held and what the page shows for it. A track is an ordered list of
+# asana names, so adding a track only needs an entry in TRACKS. "references" are the
+# reference photos asana_library builds its nearest-neighbour recognizer from.
+
+ASANAS = {
+    "pranamasana": {
+        "label": "Pranamasana",
+        "image": "./images/pranamasana2.png",
+        "references": ["./images/pranamasana.png", "./images/pranamasana2.png", "./images/pranmasana.webp"],
+        "hold": 5,
+        "rules": {
+            "left_arm_raise": (None, 100),
+            "right_arm_raise": (None, 100),
+            "wrist_distance": (None, 0.1),
+        },
+        "instructions": """
+            Pranamasana (Prayer Pose):
+            - Stand straight with feet together.
+            - Bring palms together in front of chest.
+            - Keep the spine erect and shoulders relaxed.
+            - Focus on breathing deeply and evenly.
+            - Hold for 5 seconds, breathe deeply.
+        """,
+    },
+    "eka_pada_pranamasana": {
+        "label": "Eka Pada Pranamasana",
+        "image": "./images/Eka_Pada_Pranamasana.png",
+        "references": ["./images/Eka_Pada_Pranamasana.png"],
+        "hold": 5,
+        "rules": {
+            "left_arm_raise": (100, None),
+            "right_arm_raise": (100, None),
+            "right_knee": (None, 90),
+            "wrist_distance": (None, 0.1),
+        },
+        "instructions": """
+            Eka Pada Pranamasana (One-Legged Prayer Pose):
+            - Shift weight to left leg.
+            - Bend right knee, place right foot on inner thigh.
+            - Hold for 5 seconds.
+            - Repeat on other side.
+        """,
+    },
+    "ashwa_sanchalanasana": {
+        "label": "Ashwa Sanchalanasana",
+        "image": "./images/Ashwa_Sanchalanasana.webp",
+        "references": ["./images/Ashwa_Sanchalanasana.webp"],
+        "hold": 5,
+        "rules": {
+            "left_knee": (90, None),
+            "right_knee": (None, 150),
+        },
+        "instructions": """
+            Ashwa Sanchalanasana (Equestrian Pose):
+            - Step right foot back into lunge.
+            - Lower right knee, raise arms overhead.
+            - Hold for 5 seconds.
+            - Repeat on other side.
+        """,
+    },
+    "ardha_chakrasana": {
+        "label": "Ardha Chakrasana",
+        "image": "./images/ardha_chakrasana.webp",
+        "references": [
+            "./images/ardha_chakrasana.webp",
+            "./images/Ardha_Chakrasana2.png",
+            "./images/Ardha_Chakrasana2-latest.png",
+        ],
+        "hold": 5,
+        "rules": {
+            "left_arm_raise": (100, None),
+            "right_arm_raise": (100, None),
+            "wrist_distance": (None, 0.1),
+        },
+        "instructions": """
+            Ardha Chakrasana (Half Wheel Pose):
+            - Stand with feet hip-width apart.
+            - Inhale, raise arms overhead, palms together.
+            - Exhale, bend backwards, keeping arms straight.
+            - Hold for 5 seconds.
+        """,
+    },
+    "utkatasana": {
+        "label": "Utkatasana",
+        "image": "./images/Utkatasana.png",
+        "references": ["./images/Utkatasana.png", "./images/Utkatasana.webp"],
+        "hold": 5,
+        "rules": {
+            "left_knee": (None, 150),
+            "right_knee": (None, 150),
+            "left_elbow": (150, None),
+            "right_elbow": (150, None),
+            "left_shoulder": (120, None),
+            "right_shoulder": (120, None),
+        },
+        "instructions": """
+            Utkatasana (Chair Pose):
+            - Stand with feet together.
+            - Inhale, raise arms overhead.
+            - Exhale, bend knees and lower hips as if sitting on a chair.
+            - Hold for 5 seconds.
+        """,
+    },
+    "veerabhadrasana_2": {
+        "label": "Veerabhadrasana 2",
+        "image": "./images/Veerabhadrasan_2.png",
+        "references": [
+            "./images/Veerabhadrasan_2.png",
+            "./images/Veerabhadrasana2.png",
+            "./images/Veerabhadrasana2_new.png",
+        ],
+        "hold": 5,
+        "rules": {
+            "right_knee": (None, 120),
+            "left_elbow": (150, None),
+            "right_elbow": (150, None),
+            "left_shoulder": (None, 120),
+            "right_shoulder": (None, 120),
+        },
+        "instructions": """
+            Veerabhadrasana 2 (Warrior 2 Pose):
+            - Step left foot back, right foot forward.
+            - Bend right knee, aligning it with ankle.
+            - Extend arms parallel to ground, palms facing down.
+            - Hold for 5 seconds.
+        """,
+    },
+}
+
+TRACKS = {
+    "Track 1": ["pranamasana", "eka_pada_pranamasana", "ashwa_sanchalanasana"],
+    "Track 2": ["ardha_chakrasana", "utkatasana", "veerabhadrasana_2"],
+}
+
+RULES = PoseRules(ASANAS)
+
+for _track, _poses in TRACKS.items():
+    for _name in _poses:
+        if _name not in ASANAS:
+            raise ValueError(f"Unknown asana '{_name}' in {_track}")